@@ -1,21 +1,187 @@
-from djitellopy import Tello
-import cv2
-import pygame
-import numpy as np
+import argparse
+import multiprocessing
+import os
+import threading
 import time
-from dependencies.faceRecognition import FacialRecognition as fr
+from collections import deque
+
+import numpy as np
+import pygame
+from djitellopy import Tello
+
+from dependencies.simTello import SimTello
 
 # Speed of the drone
 S = 60
 # Frames per second of the pygame window display
 FPS = 120
+# How often the telemetry poller refreshes the HUD
+TELEMETRY_INTERVAL = 1.0
+# Frame times kept for the exit report, the last minute at full frame rate
+FRAME_TIME_WINDOW = FPS * 60
 
-FaceRecognition = fr("faces")
 
+def recognition_process(connection):
+    """
+    Child process side of RecognitionWorker: load the gallery, then answer each
+    frame with ("ok", (locations, names)) until sent None.
+    """
+    from dependencies.faceRecognition import FacialRecognition
 
-class FrontEnd(object):
+    recognizer = FacialRecognition("faces")
+    connection.send(("ready", None))
+    while True:
+        frame = connection.recv()
+        if frame is None:
+            return
+        try:
+            connection.send(("ok", recognizer.detect_face(frame)))
+        except Exception as e:
+            connection.send(("error", str(e)))
+
+
+class StageProfiler:
+    """
+    Keeps the last `window` timings of each render stage so they can be drawn on
+    screen and summarised at exit.
+    """
+
+    def __init__(self, window=240):
+        self.window = window
+        self.stages = {}
+
+    def record(self, stage, seconds):
+        if stage not in self.stages:
+            self.stages[stage] = deque(maxlen=self.window)
+        self.stages[stage].append(seconds)
+
+    def summary(self):
+        result = {}
+        for stage, samples in self.stages.items():
+            ordered = sorted(samples)
+            result[stage] = {
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+            }
+        return result
+
+
+class TelemetryPoller(threading.Thread):
+    """Polls the drone off the render thread so a slow getter never stalls a frame."""
+
+    def __init__(self, tello, interval=TELEMETRY_INTERVAL):
+        super().__init__(daemon=True)
+        self.tello = tello
+        self.interval = interval
+        self.battery = None
+        self.version = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                battery = self.tello.get_battery()
+                if battery != self.battery:
+                    self.battery = battery
+                    self.version += 1
+            except Exception as e:
+                print(f"Error polling telemetry: {e}")
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class RecognitionWorker(threading.Thread):
+    """
+    Runs face recognition on the newest frame it's given, dropping any frames
+    that arrive while it's busy. Results are picked up by the render loop.
+
+    dlib holds the GIL for the whole of a detection, which stalled the render
+    thread for 100+ ms at a time, so the recognition itself runs in a child
+    process. This thread only hands it frames and waits for answers.
+    """
 
     def __init__(self):
+        super().__init__(daemon=True)
+        self.condition = threading.Condition()
+        self.pending = None
+        self.face_locations = []
+        self.face_names = []
+        self.last_seconds = 0.0
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        # Spawned rather than forked, pygame and SDL's threads shouldn't be copied into it
+        self.connection, child = multiprocessing.get_context("spawn").Pipe()
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=recognition_process, args=(child,), daemon=True
+        )
+
+    def start(self):
+        self.process.start()
+        super().start()
+
+    def is_ready(self):
+        return self.ready.is_set()
+
+    def submit(self, frame):
+        with self.condition:
+            self.pending = frame
+            self.condition.notify()
+
+    def reply(self):
+        """Wait for the child's next message, or None if stopped or it died first."""
+        while not self.connection.poll(0.1):
+            if self.stop_event.is_set() or not self.process.is_alive():
+                return None
+        return self.connection.recv()
+
+    def run(self):
+        try:
+            if self.reply() is None:
+                return
+            self.ready.set()
+            while not self.stop_event.is_set():
+                with self.condition:
+                    while self.pending is None and not self.stop_event.is_set():
+                        self.condition.wait(0.5)
+                    frame, self.pending = self.pending, None
+                if frame is None:
+                    continue
+                start = time.perf_counter()
+                # detect_known_faces converts BGR to RGB itself
+                self.connection.send(frame)
+                reply = self.reply()
+                if reply is None:
+                    return
+                if reply[0] == "ok":
+                    self.face_locations, self.face_names = reply[1]
+                else:
+                    print(f"Error in face recognition: {reply[1]}")
+                self.last_seconds = time.perf_counter() - start
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        try:
+            self.connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        # It finishes the frame it's on first
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify()
+
+
+class FrontEnd(object):
+
+    def __init__(self, tello=None, recognition=True, max_frames=None):
         """Maintains the Tello display and moves it through the keyboard keys.
         Press escape key to quit.
         The controls are:
@@ -24,11 +190,13 @@ class FrontEnd(object):
             - Arrow keys: Forward, backward, left and right.
             - A and D: Counter clockwise and clockwise rotations (yaw)
             - W and S: Up and down.
+            - P: Show or hide the frame time profiler
         """
         pygame.init()
         pygame.display.set_caption("Tello video stream")
         self.screen = pygame.display.set_mode([960, 720])
-        self.tello = Tello()
+        self.font = pygame.font.SysFont(None, 24)
+        self.tello = tello if tello is not None else Tello()
         self.for_back_velocity = 0
         self.left_right_velocity = 0
         self.up_down_velocity = 0
@@ -36,7 +204,73 @@ class FrontEnd(object):
         self.speed = 10
         self.send_rc_control = False
         pygame.time.set_timer(pygame.USEREVENT + 1, 1000 // FPS)
-        self.PERFRAMERECOGNITION = 1
+        self.max_frames = max_frames
+        self.show_profiler = True
+        self.profiler = StageProfiler()
+        self.telemetry = TelemetryPoller(self.tello)
+        self.recognition = RecognitionWorker() if recognition else None
+
+        # Frames are copied into this buffer, which the surface wraps without copying
+        self.frame_buffer = None
+        self.frame_surface = None
+        self.hud_surface = None
+        self.hud_version = -1
+        self.profiler_surfaces = []
+        self.profiler_updated = 0.0
+
+    def frame_to_surface(self, frame):
+        if self.frame_buffer is None or self.frame_buffer.shape != frame.shape:
+            self.frame_buffer = np.empty_like(frame)
+            height, width = frame.shape[:2]
+            self.frame_surface = pygame.image.frombuffer(self.frame_buffer, (width, height), "BGR")
+        np.copyto(self.frame_buffer, frame)
+        return self.frame_surface
+
+    def draw_faces(self):
+        if self.recognition is None:
+            return
+        for face_loc, name in zip(self.recognition.face_locations, self.recognition.face_names):
+            y1, x2, y2, x1 = face_loc[0], face_loc[1], face_loc[2], face_loc[3]
+            pygame.draw.rect(self.screen, (200, 0, 0), pygame.Rect(x1, y1, x2 - x1, y2 - y1), 4)
+            self.screen.blit(self.font.render(name, True, (200, 0, 0)), (x1, y1 - 20))
+
+    def draw_hud(self):
+        # Only re-render the text when the poller has a new value
+        if self.telemetry.version != self.hud_version:
+            self.hud_version = self.telemetry.version
+            text = "Battery: {}%".format(self.telemetry.battery if self.telemetry.battery is not None else "--")
+            self.hud_surface = self.font.render(text, True, (255, 0, 0))
+        self.screen.blit(self.hud_surface, (5, self.screen.get_height() - 25))
+
+    def draw_profiler(self, now):
+        if not self.show_profiler:
+            return
+        if now - self.profiler_updated > 0.25:
+            self.profiler_updated = now
+            lines = [
+                "{:<9} {:6.2f} ms  p99 {:6.2f}".format(stage, s["mean_ms"], s["p99_ms"])
+                for stage, s in self.profiler.summary().items()
+            ]
+            if self.recognition is not None:
+                lines.append("recognize {:6.2f} ms (worker)".format(self.recognition.last_seconds * 1000))
+            self.profiler_surfaces = [self.font.render(line, True, (255, 255, 0)) for line in lines]
+        for i, surface in enumerate(self.profiler_surfaces):
+            self.screen.blit(surface, (5, 5 + i * 20))
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.USEREVENT + 1:
+                self.update()
+            elif event.type == pygame.QUIT:
+                return True
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    return True
+                else:
+                    self.keydown(event.key)
+            elif event.type == pygame.KEYUP:
+                self.keyup(event.key)
+        return False
 
     def run(self):
         self.tello.connect()
@@ -45,60 +279,103 @@ class FrontEnd(object):
         self.tello.streamon()
 
         frame_read = self.tello.get_frame_read()
-        should_stop = False
-        while not should_stop:
-            for event in pygame.event.get():
-                if event.type == pygame.USEREVENT + 1:
-                    self.update()
-                elif event.type == pygame.QUIT:
-                    should_stop = True
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        should_stop = True
-                    else:
-                        self.keydown(event.key)
-                elif event.type == pygame.KEYUP:
-                    self.keyup(event.key)
+        self.telemetry.start()
+        if self.recognition is not None:
+            self.recognition.start()
 
+        frame_period = 1 / FPS
+        deadline = time.perf_counter()
+        frames = 0
+        last_frame = None
+        run_start = time.perf_counter()
+        frame_times = deque(maxlen=FRAME_TIME_WINDOW)
+        while True:
+            t0 = time.perf_counter()
+            if self.handle_events():
+                break
             if frame_read.stopped:
                 break
 
             frame = frame_read.frame
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            # Find all the faces and face encodings in the current frame of video
-
-            if self.PERFRAMERECOGNITION % 10 == 0:
-                face_locations, face_names = FaceRecognition.detect_face(frame_rgb)
-                for face_loc, name in zip(face_locations, face_names):
-                    y1, x2, y2, x1 = face_loc[0], face_loc[1], face_loc[2], face_loc[3]
-                    cv2.putText(
-                        frame,
-                        name,
-                        (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_DUPLEX,
-                        1,
-                        (0, 0, 200),
-                        2,
-                    )
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 200), 4)
-
-            self.screen.fill([0, 0, 0])
-            text = "Battery: {}%".format(self.tello.get_battery())
-            cv2.putText(
-                frame, text, (5, 720 - 5), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2
-            )
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frame = np.rot90(frame)
-            frame = np.flipud(frame)
-            frame = pygame.surfarray.make_surface(frame)
-            self.screen.blit(frame, (0, 0))
+            t1 = time.perf_counter()
+            if frame is not None:
+                if frame is not last_frame:
+                    self.frame_to_surface(frame)
+                    # The worker keeps whatever it's given, so hand it the reader's array, not our buffer
+                    if self.recognition is not None and self.recognition.is_ready():
+                        self.recognition.submit(frame)
+                    last_frame = frame
+                t2 = time.perf_counter()
+                self.screen.blit(self.frame_surface, (0, 0))
+            else:
+                t2 = time.perf_counter()
+                self.screen.fill([0, 0, 0])
+            t3 = time.perf_counter()
+            self.draw_faces()
+            self.draw_hud()
+            self.draw_profiler(t3)
+            t4 = time.perf_counter()
             pygame.display.update()
+            t5 = time.perf_counter()
 
-            time.sleep(1 / FPS)
-            self.PERFRAMERECOGNITION += 1
+            self.profiler.record("events", t1 - t0)
+            self.profiler.record("copy", t2 - t1)
+            self.profiler.record("blit", t3 - t2)
+            self.profiler.record("overlay", t4 - t3)
+            self.profiler.record("display", t5 - t4)
+            self.profiler.record("frame", t5 - t0)
 
+            frames += 1
+            if self.max_frames and frames >= self.max_frames:
+                break
+
+            # Sleep to the next frame deadline rather than a fixed 1/FPS, so the
+            # time spent on this frame isn't added on top
+            deadline += frame_period
+            remaining = deadline - time.perf_counter()
+            if remaining < -frame_period:
+                # Too far behind to catch up, don't burst frames to make up for it
+                deadline = time.perf_counter()
+            elif remaining > 0:
+                if remaining > 0.002:
+                    time.sleep(remaining - 0.002)
+                while time.perf_counter() < deadline:
+                    pass
+            frame_times.append(time.perf_counter() - t0)
+
+        elapsed = time.perf_counter() - run_start
+        # Wait for the workers to finish, a thread still inside a drone call or the
+        # recognition pipe when the interpreter exits takes the process down with it
+        self.telemetry.stop()
+        if self.recognition is not None:
+            self.recognition.stop()
+            self.recognition.join()
+        self.telemetry.join()
         self.tello.end()
+        pygame.quit()
+        return self.report(frames, elapsed, frame_times)
+
+    def report(self, frames, elapsed, frame_times):
+        if not frames:
+            return {}
+        ordered = sorted(frame_times)
+        mean = sum(ordered) / len(ordered)
+        jitter = (sum((t - mean) ** 2 for t in ordered) / len(ordered)) ** 0.5
+        result = {
+            "frames": frames,
+            "fps": frames / elapsed,
+            "frame_mean_ms": mean * 1000,
+            "frame_p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+            "frame_jitter_ms": jitter * 1000,
+            "stages": self.profiler.summary(),
+        }
+        print(
+            "{frames} frames, {fps:.1f} fps, frame {frame_mean_ms:.2f} ms "
+            "(p99 {frame_p99_ms:.2f} ms, jitter {frame_jitter_ms:.3f} ms)".format(**result)
+        )
+        for stage, s in result["stages"].items():
+            print("  {:<9} {:6.3f} ms  p99 {:6.3f} ms".format(stage, s["mean_ms"], s["p99_ms"]))
+        return result
 
     def keydown(self, key):
         """Update velocities based on key pressed
@@ -145,6 +422,8 @@ class FrontEnd(object):
         elif key == pygame.K_l:  # land
             not self.tello.land()
             self.send_rc_control = False
+        elif key == pygame.K_p:  # toggle profiler
+            self.show_profiler = not self.show_profiler
 
     def update(self):
         if self.send_rc_control:
@@ -157,7 +436,22 @@ class FrontEnd(object):
 
 
 def main():
-    frontend = FrontEnd()
+    parser = argparse.ArgumentParser(description="Fly the Tello from the keyboard")
+    parser.add_argument("--sim", action="store_true", help="use the simulated drone")
+    parser.add_argument("--headless", action="store_true", help="render with SDL's dummy video driver")
+    parser.add_argument("--frames", type=int, default=None, help="quit after this many frames")
+    parser.add_argument("--no-recognition", action="store_true", help="don't run face recognition")
+    args = parser.parse_args()
+
+    if args.headless:
+        # Has to be set before pygame.init()
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    frontend = FrontEnd(
+        tello=SimTello() if args.sim else None,
+        recognition=not args.no_recognition,
+        max_frames=args.frames,
+    )
     frontend.run()
 
 
@@ -6,15 +6,46 @@ import threading
 import sys
 import os
 import math
+import gc
+from collections import deque
 from queue import Queue
 from threading import Thread, Barrier
 from typing import List, Callable, Optional
-from .enforce_types import enforce_types
+try:
+    from .enforce_types import enforce_types
+except ImportError:
+    # Imported as a top-level module, e.g. from the repo root
+    from enforce_types import enforce_types
 import logging
 
 import asyncio
 
 
+def dispatch_skew(sent, release_at=None):
+    """
+    Skew stats for one broadcast: how long after the first drone each drone's
+    command went out, in microseconds. With a release time, also how late the
+    first send was.
+    """
+    if not sent:
+        return {"drones": 0}
+    offsets = sorted(t - sent[0] for t in sent)
+
+    def percentile(p):
+        return round(offsets[min(len(offsets) - 1, int(len(offsets) * p))] * 1e6, 1)
+
+    report = {
+        "drones": len(sent),
+        "max_us": round(offsets[-1] * 1e6, 1),
+        "p50_us": percentile(0.5),
+        "p99_us": percentile(0.99),
+        "mean_us": round(sum(offsets) / len(offsets) * 1e6, 1),
+    }
+    if release_at is not None:
+        report["release_error_us"] = round((sent[0] - release_at) * 1e6, 1)
+    return report
+
+
 # TelloSwarm class
 # I stole enforce_types from https://github.com/Linaom1214/tello-swarm/blob/main/djitellopy/swarm.py
 @enforce_types
@@ -31,6 +62,7 @@ class TelloSwarm:
     threads: List[Thread]
     curDrone: int
     known_landmarks: List[np.ndarray]
+    landmark_keypoints: List[Optional[np.ndarray]]
 
     @staticmethod
     def fromIPString(ip_string: str):
@@ -56,6 +88,8 @@ class TelloSwarm:
         self.funcQueues = [Queue() for _ in range(self.swarm_size)]
         self.threads = []
         self.curDrone = 0
+        # Send timestamps of recent broadcasts, newest last
+        self.broadcast_log = deque(maxlen=100)
         self.initThreads()
 
     def initThreads(self):
@@ -79,23 +113,42 @@ class TelloSwarm:
 
         self.threads = []
         for i in range(self.swarm_size):
-            thread = Thread(target=worker, args=(i,))
+            # Daemon so the workers, which wait on their queue forever, don't keep the program alive
+            thread = Thread(target=worker, args=(i,), daemon=True)
             thread.start()
             self.threads.append(thread)
 
     def load_known_landmarks(self, descriptor_paths):
+        """
+        Load landmark descriptors, either plain .npy descriptor files or vocabulary
+        prefixes written by makeLandmarks.py (<prefix>.desc.npy + <prefix>.kp.npy).
+        Files are memory-mapped, so large vocabularies aren't read up front.
+        """
         landmarks = []
+        keypoints = []
         for path in descriptor_paths:
-            descriptors = np.load(path)
-            landmarks.append(descriptors)
+            if path.endswith(".npy"):
+                landmarks.append(np.load(path, mmap_mode="r"))
+                keypoints.append(None)
+            else:
+                landmarks.append(np.load(path + ".desc.npy", mmap_mode="r"))
+                keypoints.append(np.load(path + ".kp.npy", mmap_mode="r"))
         self.known_landmarks = landmarks
+        self.landmark_keypoints = keypoints
+        self.orb = cv2.ORB_create()
+        self.bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
 
     def detect_landmarks(self, frame):
         # Detect keypoints and descriptors in the current frame
         keypoints, descriptors = self.orb.detectAndCompute(frame, None)
+        if descriptors is None:
+            return []
         matches = []
-        for landmark in self.known_landmarks:
-            matches.extend(self.bf.match(descriptors, landmark))
+        for i, landmark in enumerate(self.known_landmarks):
+            for match in self.bf.match(descriptors, landmark):
+                # Remember which landmark set the match came from
+                match.imgIdx = i
+                matches.append(match)
         matches = sorted(matches, key=lambda x: x.distance)
         return matches
 
@@ -103,14 +156,19 @@ class TelloSwarm:
         frame = self.drones[drone_index].get_frame_read().frame
         gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         matches = self.detect_landmarks(gray_frame)
-        if matches:
-            positions = [self.compute_position_from_match(match) for match in matches]
+        # Matches against landmark sets without geometry (legacy .npy files) can't place the drone
+        positions = [self.compute_position_from_match(match) for match in matches]
+        positions = [position for position in positions if position is not None]
+        if positions:
             avg_position = np.mean(positions, axis=0)
             return avg_position
         return None
 
     def compute_position_from_match(self, match):
-        return np.array([match.pt[0], match.pt[1], 0])
+        keypoints = self.landmark_keypoints[match.imgIdx]
+        if keypoints is None:
+            return None
+        return np.array([keypoints[match.trainIdx, 0], keypoints[match.trainIdx, 1], 0])
 
     def fly_in_formation(
         self, leader_index: int, distance: float = 100.0, a: float = 2.5
@@ -176,6 +234,45 @@ class TelloSwarm:
             queue.put(func)
         self.funcBarrier.wait()
 
+    def broadcast(self, command: str, release_at: Optional[float] = None, spin: float = 0.002):
+        """
+        Send one SDK command to every drone from this thread, back to back, so
+        the spread between drones is only the time a send takes rather than
+        how the worker threads happen to get scheduled.
+
+        With release_at (a time.monotonic() value) the first send goes out at
+        that time: sleep until `spin` seconds before, then busy-wait.
+
+        Returns the dispatch skew stats; the per-drone send times are kept in
+        broadcast_log.
+        """
+        senders = [drone.send_command_without_return for drone in self.drones]
+        sent = [0.0] * len(senders)
+        if release_at is not None:
+            remaining = release_at - time.monotonic()
+            if remaining > spin:
+                time.sleep(remaining - spin)
+            while time.monotonic() < release_at:
+                pass
+        # A collection in the middle of the loop would be most of the skew
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for i, send in enumerate(senders):
+                send(command)
+                sent[i] = time.monotonic()
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        report = dispatch_skew(sent, release_at)
+        self.broadcast_log.append({"command": command, "release_at": release_at, "sent": sent, "skew": report})
+        logging.info(
+            f"Broadcast {command!r} to {len(sent)} drones: "
+            f"max skew {report['max_us']} us, p99 {report['p99_us']} us"
+        )
+        return report
+
     def health_check(self):
         statuses = []
         for i, drone in enumerate(self.drones):
@@ -0,0 +1,192 @@
+"""
+Run SimpleFacerec over recorded footage instead of live frames.
+
+Frames are streamed from video files and/or image directories and spread over a
+process pool, each worker loading its own SimpleFacerec (and encoding the
+gallery) once. Results come back in frame order and are written as JSON Lines,
+one line per frame:
+
+    {"source": "flight.mp4", "frame": 12, "faces": [{"box": [x1, y1, x2, y2], "name": "Will", "distance": 0.41}]}
+
+Usage:
+    python batchFaceRecognition.py recordings/ flight.mp4 -o faces.jsonl --workers 8
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+from dependencies.simple_facerec import SimpleFacerec
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".h264")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Set in each worker by init_worker
+worker_sfr = None
+worker_init_s = 0.0
+
+
+def init_worker(faces_path, frame_resizing, tolerance):
+    global worker_sfr, worker_init_s
+    start = time.perf_counter()
+    worker_sfr = SimpleFacerec()
+    worker_sfr.frame_resizing = frame_resizing
+    worker_sfr.tolerance = tolerance
+    worker_sfr.load_encoding_images(faces_path)
+    worker_init_s = time.perf_counter() - start
+
+
+def process_frame(task):
+    """Runs in a worker. Images are passed by path so only videos pay for pickling pixels."""
+    source, index, frame = task
+    start = time.perf_counter()
+    if isinstance(frame, str):
+        frame = cv2.imread(frame)
+    faces = []
+    if frame is not None:
+        locations, names, distances = worker_sfr.detect_known_faces_with_distances(frame)
+        for (y1, x2, y2, x1), name, distance in zip(locations.tolist(), names, distances):
+            faces.append({
+                "box": [x1, y1, x2, y2],
+                "name": name,
+                "distance": None if distance is None else round(distance, 4),
+            })
+    busy = time.perf_counter() - start
+    return {"source": source, "frame": index, "faces": faces}, os.getpid(), busy, worker_init_s
+
+
+def iter_frames(inputs, every=1):
+    """Yield (source, frame_index, frame_or_path) from video files and image directories."""
+    for path in inputs:
+        if os.path.isdir(path):
+            images = sorted(
+                p for p in glob.glob(os.path.join(path, "*.*"))
+                if p.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            for index, image_path in enumerate(images):
+                if index % every == 0:
+                    yield image_path, index, image_path
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            yield path, 0, path
+        else:
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                print(f"Could not open {path}, skipping", file=sys.stderr)
+                continue
+            index = 0
+            while True:
+                # grab() skips decoding frames we're not going to use
+                if not cap.grab():
+                    break
+                if index % every == 0:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        yield path, index, frame
+                index += 1
+            cap.release()
+
+
+def bounded(iterable, semaphore):
+    """Pool.imap reads its input as fast as it can; this keeps only a window of frames in flight."""
+    for item in iterable:
+        semaphore.acquire()
+        yield item
+
+
+def run_batch(inputs, output_path, faces_path="faces", workers=None, frame_resizing=0.25,
+              tolerance=0.6, every=1, chunksize=4, max_in_flight=None):
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * chunksize * 4
+    in_flight = threading.Semaphore(max_in_flight)
+
+    frames = 0
+    faces = 0
+    worker_busy = {}
+    worker_frames = {}
+    worker_init = {}
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(
+        workers, initializer=init_worker, initargs=(faces_path, frame_resizing, tolerance)
+    ) as pool, open(output_path, "w") as out:
+        results = pool.imap(process_frame, bounded(iter_frames(inputs, every), in_flight), chunksize)
+        for result, pid, busy, init in results:
+            in_flight.release()
+            out.write(json.dumps(result) + "\n")
+            frames += 1
+            faces += len(result["faces"])
+            worker_busy[pid] = worker_busy.get(pid, 0.0) + busy
+            worker_frames[pid] = worker_frames.get(pid, 0) + 1
+            worker_init[pid] = init
+    wall = time.perf_counter() - start
+
+    # Gallery loading happens in the initializer, so it's counted in wall time and
+    # reported separately as init_s. Per-core numbers use the time each worker
+    # actually spent on frames.
+    per_worker = [
+        {
+            "pid": pid,
+            "frames": worker_frames[pid],
+            "init_s": round(worker_init[pid], 3),
+            "busy_s": round(worker_busy[pid], 3),
+            "fps": round(worker_frames[pid] / worker_busy[pid], 2) if worker_busy[pid] else 0.0,
+            "utilization": round(worker_busy[pid] / wall, 3) if wall else 0.0,
+        }
+        for pid in sorted(worker_busy)
+    ]
+    busy_total = sum(worker_busy.values())
+    return {
+        "frames": frames,
+        "faces": faces,
+        "workers": workers,
+        "wall_s": round(wall, 3),
+        # Slowest gallery load, the longest any worker took before its first frame
+        "worker_init_s": round(max(worker_init.values()), 3) if worker_init else 0.0,
+        "fps": round(frames / wall, 2) if wall else 0.0,
+        "fps_per_core": round(frames / wall / workers, 2) if wall else 0.0,
+        "fps_per_busy_core": round(frames / busy_total, 2) if busy_total else 0.0,
+        "per_worker": per_worker,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline face recognition over recorded video")
+    parser.add_argument("inputs", nargs="+", help="video files, images or directories of frames")
+    parser.add_argument("-o", "--output", default="faces.jsonl", help="JSON Lines output file")
+    parser.add_argument("--faces", default="faces", help="directory of known face images")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--frame-resizing", type=float, default=0.25)
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--every", type=int, default=1, help="only process every Nth frame")
+    parser.add_argument("--chunksize", type=int, default=4)
+    args = parser.parse_args()
+
+    stats = run_batch(
+        args.inputs,
+        args.output,
+        faces_path=args.faces,
+        workers=args.workers,
+        frame_resizing=args.frame_resizing,
+        tolerance=args.tolerance,
+        every=max(1, args.every),
+        chunksize=args.chunksize,
+    )
+    print(
+        "{frames} frames, {faces} faces in {wall_s}s with {workers} workers: "
+        "{fps} fps total, {fps_per_core} fps/core ({fps_per_busy_core} fps per busy core)".format(**stats)
+    )
+    for worker in stats["per_worker"]:
+        print(
+            "  worker {pid}: {frames} frames, {fps} fps, {utilization:.0%} busy, init {init_s}s".format(**worker)
+        )
+
+
+if __name__ == "__main__":
+    main()
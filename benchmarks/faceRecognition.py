@@ -0,0 +1,263 @@
+"""
+Baseline timings for the face recognition stack, written to JSON so runs from
+different commits can be compared.
+
+Everything is built from the faces/ gallery and a fixed seed: frames are a
+noisy background with gallery faces pasted on a grid, and large galleries are
+padded with random encodings the size of real ones. Covers:
+
+    load            SimpleFacerec.load_encoding_images on faces/
+    detect          detect_known_faces per frame_resizing and face count
+    gallery         detect_known_faces with 2 to 10,000 known encodings
+    haar            the grayscale + detectMultiScale path the video stream uses
+
+From the repo root:
+
+    python -m benchmarks.faceRecognition --output before.json
+    python -m benchmarks.faceRecognition --output after.json --compare before.json
+    python -m benchmarks.faceRecognition --quick     # fewer repeats and sizes
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+
+import cv2
+import dlib
+import face_recognition
+import numpy as np
+
+from dependencies.simple_facerec import SimpleFacerec
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FACES_PATH = os.path.join(REPO_ROOT, "faces", "")
+
+FRAME_SIZE = (720, 960)
+# Faces are pasted into a 2 x 3 grid, this tall once scaled
+FACE_HEIGHT = 160
+GRID = (2, 3)
+
+# Random streams per section, so what one section draws doesn't depend on which cases another ran
+FRAME_STREAM = 0
+GALLERY_STREAM = 1
+
+
+def section_rng(seed, stream, *key):
+    return np.random.default_rng([seed, stream, *key])
+
+
+def timed(fn, repeats, warmup=1):
+    """Run fn repeatedly. Returns (timing summary in ms, fn's last result)."""
+    for _ in range(warmup):
+        result = fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    summary = {
+        "repeats": repeats,
+        "median_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        "min_ms": round(samples[0] * 1000, 3),
+    }
+    return summary, result
+
+
+def quiet(fn):
+    """load_encoding_images prints progress, keep it out of the report."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn()
+
+
+def gallery_crops():
+    """One face crop per gallery image, with some margin, scaled so the face is FACE_HEIGHT tall."""
+    crops = []
+    for name in sorted(os.listdir(FACES_PATH)):
+        image = cv2.imread(os.path.join(FACES_PATH, name))
+        if image is None:
+            continue
+        top, right, bottom, left = face_recognition.face_locations(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))[0]
+        margin = (bottom - top) * 3 // 10
+        crop = image[max(0, top - margin) : bottom + margin, max(0, left - margin) : right + margin]
+        scale = FACE_HEIGHT / (bottom - top)
+        crops.append(cv2.resize(crop, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA))
+    return crops
+
+
+def synthetic_frame(crops, faces, rng):
+    """A BGR frame with `faces` gallery faces on a noisy background, same every run for a given seed."""
+    height, width = FRAME_SIZE
+    frame = rng.integers(40, 90, size=(height, width, 3), dtype=np.uint8)
+    rows, cols = GRID
+    cell_h, cell_w = height // rows, width // cols
+    for i in range(faces):
+        crop = crops[i % len(crops)]
+        row, col = divmod(i, cols)
+        h, w = min(crop.shape[0], cell_h), min(crop.shape[1], cell_w)
+        y = row * cell_h + (cell_h - h) // 2
+        x = col * cell_w + (cell_w - w) // 2
+        frame[y : y + h, x : x + w] = crop[:h, :w]
+    return frame
+
+
+def padded_gallery(sfr, size, rng):
+    """Known encodings and names with the real ones first, padded with random ones of the same scale."""
+    real = np.array(sfr.known_face_encodings)
+    extra = size - len(real)
+    encodings, names = list(real), list(sfr.known_face_names)
+    if extra > 0:
+        noise = rng.normal(real.mean(), real.std(), size=(extra, real.shape[1]))
+        encodings += list(noise)
+        names += [f"synthetic_{i}" for i in range(extra)]
+    return encodings[:size], names[:size]
+
+
+def bench_load(repeats):
+    summary, sfr = timed(lambda: quiet(load_gallery), repeats)
+    summary["images"] = len(sfr.known_face_names)
+    return summary
+
+
+def load_gallery():
+    sfr = SimpleFacerec()
+    sfr.load_encoding_images(FACES_PATH)
+    return sfr
+
+
+def bench_detect(sfr, frames, resizings, repeats):
+    results = []
+    for resizing in resizings:
+        sfr.frame_resizing = resizing
+        for faces, frame in frames.items():
+            summary, (locations, names) = timed(lambda: sfr.detect_known_faces(frame), repeats)
+            summary.update(frame_resizing=resizing, faces=faces, found=len(locations), recognized=sum(n != "Unknown" for n in names))
+            results.append(summary)
+            print(f"detect resizing={resizing} faces={faces}: {summary['median_ms']} ms, found {summary['found']}")
+    return results
+
+
+def bench_gallery(sfr, frame, sizes, repeats, seed):
+    real = (list(sfr.known_face_encodings), list(sfr.known_face_names))
+    encoding = face_recognition.face_encodings(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))[0]
+    results = []
+    try:
+        for size in sizes:
+            # Seeded by size, so a gallery is the same whatever --galleries lists
+            padded = padded_gallery(sfr, size, section_rng(seed, GALLERY_STREAM, size))
+            sfr.known_face_encodings, sfr.known_face_names = padded
+            full, _ = timed(lambda: sfr.detect_known_faces(frame), repeats)
+            # Just the matching step, what grows with the gallery
+            match, _ = timed(lambda: np.argmin(face_recognition.face_distance(sfr.known_face_encodings, encoding)), repeats)
+            results.append({"gallery": size, "detect": full, "match": match})
+            print(f"gallery {size}: detect {full['median_ms']} ms, match {match['median_ms']} ms")
+            sfr.known_face_encodings, sfr.known_face_names = real
+    finally:
+        sfr.known_face_encodings, sfr.known_face_names = real
+    return results
+
+
+def bench_haar(frames, repeats):
+    # Same cascade and parameters as runBackend.detect_haar
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    results = []
+    for faces, frame in frames.items():
+        summary, found = timed(lambda: cascade.detectMultiScale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 1.1, 5), repeats)
+        summary.update(faces=faces, found=len(found))
+        results.append(summary)
+        print(f"haar faces={faces}: {summary['median_ms']} ms, found {summary['found']}")
+    return results
+
+
+def environment(seed):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "dlib": dlib.__version__,
+        "face_recognition": face_recognition.__version__,
+    }
+
+
+def medians(report):
+    """Flatten a report to {case name: median ms} for comparing runs."""
+    flat = {"load": report["load"]["median_ms"]}
+    for r in report["detect"]:
+        flat[f"detect resizing={r['frame_resizing']} faces={r['faces']}"] = r["median_ms"]
+    for r in report["gallery"]:
+        flat[f"gallery {r['gallery']} detect"] = r["detect"]["median_ms"]
+        flat[f"gallery {r['gallery']} match"] = r["match"]["median_ms"]
+    for r in report["haar"]:
+        flat[f"haar faces={r['faces']}"] = r["median_ms"]
+    return flat
+
+
+def compare(report, path):
+    with open(path) as f:
+        baseline = medians(json.load(f))
+    print(f"\nvs {path} (median ms, + is slower)")
+    for case, ms in medians(report).items():
+        if case in baseline and baseline[case]:
+            change = (ms - baseline[case]) / baseline[case] * 100
+            print(f"  {case:40s} {baseline[case]:10.3f} -> {ms:10.3f}  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face recognition benchmark suite")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--resizing", default="0.25,0.5,1.0", help="comma separated frame_resizing values")
+    parser.add_argument("--faces", default="0,1,2,4", help="comma separated face counts")
+    parser.add_argument("--galleries", default="2,100,1000,10000", help="comma separated gallery sizes")
+    parser.add_argument("--quick", action="store_true", help="3 repeats, fewer cases")
+    parser.add_argument("--output", default="face_recognition_benchmark.json")
+    parser.add_argument("--compare", help="earlier output to compare against")
+    args = parser.parse_args()
+    if args.quick:
+        # Only cut down what wasn't set explicitly
+        quick = {"repeats": 3, "resizing": "0.25,0.5", "faces": "0,1,4", "galleries": "2,1000,10000"}
+        for name, value in quick.items():
+            if getattr(args, name) == parser.get_default(name):
+                setattr(args, name, value)
+
+    crops = gallery_crops()
+    # Each frame is seeded by its face count, so it's the same frame whatever --faces lists
+    faces = [int(n) for n in args.faces.split(",")]
+    frames = {n: synthetic_frame(crops, n, section_rng(args.seed, FRAME_STREAM, n)) for n in faces}
+    one_face = frames[1] if 1 in frames else synthetic_frame(crops, 1, section_rng(args.seed, FRAME_STREAM, 1))
+
+    report = {"environment": environment(args.seed)}
+    report["load"] = bench_load(max(1, args.repeats // 2))
+    print(f"load_encoding_images: {report['load']['median_ms']} ms for {report['load']['images']} images")
+    sfr = quiet(load_gallery)
+    report["detect"] = bench_detect(sfr, frames, [float(r) for r in args.resizing.split(",")], args.repeats)
+    sfr.frame_resizing = 0.25
+    report["gallery"] = bench_gallery(sfr, one_face, [int(n) for n in args.galleries.split(",")], args.repeats, args.seed)
+    report["haar"] = bench_haar(frames, args.repeats)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Inference CPU saved by the motion gate on a hover-heavy flight. Flies the same
+scripted flight against a simulated drone twice, once running the detector on
+every frame and once behind a MotionGate, and compares how much inference ran.
+
+The camera sees a gallery face (see benchmarks.faceRecognition) that pans with
+yaw, with per-frame sensor noise so a hover isn't pixel-identical. The flight
+is mostly hovering with a few turns.
+
+From the repo root:
+
+    python -m benchmarks.motionGate
+    python -m benchmarks.motionGate --detector recognition --threshold 0.02 --max-age 0.5
+    python -m benchmarks.motionGate --quick --output motion_gate.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.faceRecognition import FACES_PATH, gallery_crops, synthetic_frame
+from dependencies.framePipeline import DetectionWorker, FrameSource
+from dependencies.motionGate import MotionGate
+from dependencies.simTello import SimFrameRead, SimTello
+
+# (phase, seconds, yaw rc): about 85% of the time hovering
+FLIGHT = [
+    ("hover", 8.0, 0),
+    ("turn", 1.5, 40),
+    ("hover", 8.0, 0),
+    ("turn", 1.5, -40),
+    ("hover", 6.0, 0),
+]
+
+
+class HoverFrameRead(SimFrameRead):
+    """SimFrameRead showing a face scene instead of the gradient, with sensor noise on every frame."""
+
+    def __init__(self, drone, scene, noise, rng):
+        super().__init__(drone, width=scene.shape[1], height=scene.shape[0])
+        self.base = scene
+        # A few noise patterns cycled through, generating them per frame would dominate the CPU numbers
+        self.noise = [rng.integers(0, 2 * noise + 1, size=scene.shape, dtype=np.uint8) for _ in range(8)]
+        self.offset = np.full(scene.shape, noise, dtype=np.uint8)
+        self.count = 0
+
+    @property
+    def frame(self):
+        previous = self._frame
+        rolled = SimFrameRead.frame.fget(self)
+        if rolled is not previous:
+            self.count += 1
+            self._frame = cv2.subtract(cv2.add(rolled, self.noise[self.count % len(self.noise)]), self.offset)
+        return self._frame
+
+
+def haar_detector():
+    # Same cascade and parameters as runBackend.detect_haar
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+    def detect(frame):
+        faces = cascade.detectMultiScale(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 1.1, 5)
+        boxes = [(x, y, x + w, y + h) for x, y, w, h in faces]
+        return boxes, [""] * len(boxes), [None] * len(boxes)
+
+    return detect
+
+
+def recognition_detector():
+    from dependencies.simple_facerec import SimpleFacerec
+
+    sfr = SimpleFacerec()
+    with contextlib.redirect_stdout(io.StringIO()):
+        sfr.load_encoding_images(FACES_PATH)
+
+    def detect(frame):
+        locations, names, distances = sfr.detect_known_faces_with_distances(frame)
+        return [(x1, y1, x2, y2) for y1, x2, y2, x1 in locations], names, distances
+
+    return detect
+
+
+DETECTORS = {"haar": haar_detector, "recognition": recognition_detector}
+
+
+def fly(detector_id, detect, scene, gate, flight, noise, seed):
+    drone = SimTello()
+    drone.connect()
+    drone.streamon()
+    drone.frame_read = HoverFrameRead(drone, scene, noise, np.random.default_rng(seed))
+    drone.takeoff()
+    frames = FrameSource()
+    worker = DetectionWorker(frames, lambda: (detector_id, detect), gate=gate)
+    frames.start(drone)
+    worker.start()
+
+    phases = {}
+    cpu_start = time.process_time()
+    for phase, seconds, yaw in flight:
+        before = (worker.inferences, worker.reused)
+        drone.send_rc_control(0, 0, 0, yaw)
+        time.sleep(seconds)
+        totals = phases.setdefault(phase, {"seconds": 0.0, "inferences": 0, "reused": 0})
+        totals["seconds"] += seconds
+        totals["inferences"] += worker.inferences - before[0]
+        totals["reused"] += worker.reused - before[1]
+    cpu = time.process_time() - cpu_start
+    worker.stop()
+    frames.stop()
+    drone.land()
+
+    for totals in phases.values():
+        handled = totals["inferences"] + totals["reused"]
+        totals["skip_rate"] = round(totals["reused"] / handled, 4) if handled else 0.0
+    stats = worker.stats()
+    stats["process_cpu_s"] = round(cpu, 3)
+    stats["phases"] = phases
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion gate inference savings benchmark")
+    parser.add_argument("--detector", choices=sorted(DETECTORS), default="haar")
+    parser.add_argument("--threshold", type=float, default=0.01, help="fraction of the thumbnail that has to change")
+    parser.add_argument("--max-age", type=float, default=1.0)
+    parser.add_argument("--noise", type=int, default=6, help="sensor noise amplitude, +- per channel")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--quick", action="store_true", help="fly the script at a third of the length")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    flight = [(phase, seconds / 3 if args.quick else seconds, yaw) for phase, seconds, yaw in FLIGHT]
+    scene = synthetic_frame(gallery_crops(), 1, np.random.default_rng(args.seed))
+    detect = DETECTORS[args.detector]()
+
+    results = {}
+    for mode, gate in (("every_frame", None), ("gated", MotionGate(args.threshold, args.max_age))):
+        results[mode] = fly(args.detector, detect, scene, gate, flight, args.noise, args.seed)
+        r = results[mode]
+        print(
+            f"{mode}: {r['inferences']} inferences, {r['reused']} reused (skip rate {r['skip_rate']:.1%}), "
+            f"inference {r['inference_s_total']} s, process CPU {r['process_cpu_s']} s"
+        )
+        for phase, totals in r["phases"].items():
+            print(f"  {phase}: {totals['inferences']} inferences, skip rate {totals['skip_rate']:.1%}")
+
+    baseline, gated = results["every_frame"], results["gated"]
+    seconds = sum(s for _, s, _ in flight)
+    summary = {
+        "flight_s": seconds,
+        "inference_cpu_saved_s": round(baseline["inference_s_total"] - gated["inference_s_total"], 3),
+        "process_cpu_saved_s": round(baseline["process_cpu_s"] - gated["process_cpu_s"], 3),
+        "process_cpu_pct": {
+            "every_frame": round(baseline["process_cpu_s"] / seconds * 100, 1),
+            "gated": round(gated["process_cpu_s"] / seconds * 100, 1),
+        },
+    }
+    print(
+        f"saved {summary['inference_cpu_saved_s']} s of inference over a {seconds:g} s flight, "
+        f"process CPU {summary['process_cpu_pct']['every_frame']}% -> {summary['process_cpu_pct']['gated']}%"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "summary": summary, **results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
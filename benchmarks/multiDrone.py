@@ -0,0 +1,124 @@
+"""
+Measure what each extra drone costs the backend: CPU and memory of the server
+process as simulated drones are added one at a time through POST /drones, each
+with a viewer on its video feed.
+
+Reads the server's usage from /proc, so it runs on Linux. From the repo root:
+
+    python -m benchmarks.multiDrone --drones 8
+    python -m benchmarks.multiDrone --drones 16 --no-viewers --output drones.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from benchmarks.startup import wait_for
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        # Skip past the command name, which can contain spaces
+        fields = f.read().rsplit(")", 1)[1].split()
+    utime, stime = int(fields[11]), int(fields[12])
+    return (utime + stime) / CLOCK_TICKS
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 1e6
+
+
+def thread_count(pid):
+    return len(os.listdir(f"/proc/{pid}/task"))
+
+
+def measure(pid, window):
+    start_cpu, start = cpu_seconds(pid), time.monotonic()
+    time.sleep(window)
+    cpu = (cpu_seconds(pid) - start_cpu) / (time.monotonic() - start)
+    return {"cpu_percent": round(cpu * 100, 1), "rss_mb": round(rss_mb(pid), 1), "threads": thread_count(pid)}
+
+
+def post(url, data):
+    request = urllib.request.Request(
+        url, data=json.dumps(data).encode(), headers={"Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def watch(url, stop):
+    """Read an MJPEG stream until stop is set, like a browser viewer would."""
+    with urllib.request.urlopen(url, timeout=10) as response:
+        while not stop.is_set() and response.read1(65536):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-drone CPU and memory benchmark")
+    parser.add_argument("--drones", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--window", type=float, default=3.0, help="seconds to measure CPU over per step")
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds to wait after adding a drone")
+    parser.add_argument("--no-viewers", action="store_true", help="don't open a video feed per drone")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+    if args.drones < 1:
+        parser.error("--drones must be at least 1")
+
+    base = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "runBackend:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env=dict(os.environ, TELLO_SIM="1", LAZY_SUBSYSTEMS="1"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    stop = threading.Event()
+    try:
+        start = time.monotonic()
+        wait_for(base + "/ready", start, 60)
+        time.sleep(args.settle)
+        steps = [dict(drones=0, **measure(process.pid, args.window))]
+        print(f"0 drones: {steps[0]}")
+        for n in range(1, args.drones + 1):
+            drone = post(base + "/drones", {"sim": True})
+            while wait_for(f"{base}/drones/{drone['id']}", start, 60)[1]["state"] != "ready":
+                time.sleep(0.01)
+            if not args.no_viewers:
+                threading.Thread(
+                    target=watch, args=(f"{base}/drones/{drone['id']}/video_feed", stop), daemon=True
+                ).start()
+            time.sleep(args.settle)
+            step = dict(drones=n, **measure(process.pid, args.window))
+            steps.append(step)
+            print(f"{n} drones: {step}")
+    finally:
+        stop.set()
+        process.terminate()
+        process.wait()
+
+    added = steps[-1]["drones"] - steps[0]["drones"]
+    per_drone = {
+        "cpu_percent": round((steps[-1]["cpu_percent"] - steps[0]["cpu_percent"]) / added, 2),
+        "rss_mb": round((steps[-1]["rss_mb"] - steps[0]["rss_mb"]) / added, 2),
+        "threads": round((steps[-1]["threads"] - steps[0]["threads"]) / added, 2),
+    }
+    print("per added drone:", per_drone)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"viewers": not args.no_viewers, "steps": steps, "per_drone": per_drone}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Measure how quickly the safety monitor reacts to a breach on the simulated drone.
+
+Each scenario flies a SimTello with a TelemetryHub and SafetyMonitor wired up
+the way runBackend does it, causes a breach, and times it from the moment the
+breach happens to the moment the drone receives the safety command. From the
+repo root:
+
+    python -m benchmarks.safety --runs 5
+    python -m benchmarks.safety --rate 50 --output safety.json
+"""
+
+import argparse
+import json
+import random
+import time
+
+from dependencies.safetyMonitor import SafetyMonitor
+from dependencies.simTello import SimTello
+from dependencies.telemetry import TelemetryHub
+
+
+def wait_for_command(tello, prefix, after, timeout=5.0):
+    """Return the time the first command starting with prefix was sent after `after`."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for sent, command in list(tello.commands):
+            if sent >= after and command.startswith(prefix):
+                return sent
+        time.sleep(0.0005)
+    raise TimeoutError(f"No {prefix!r} command within {timeout}s")
+
+
+def battery_critical(tello, hub, monitor):
+    with tello.lock:
+        tello.battery = 9
+    breach = time.monotonic()
+    return breach, wait_for_command(tello, "land", breach)
+
+
+def tilt(tello, hub, monitor):
+    # Sim tilt is rc / 10 degrees, so full stick is a 10 degree bank
+    monitor.configure({"tilt": {"above": 5}})
+    tello.send_rc_control(100, 0, 0, 0)
+    breach = time.monotonic()
+    return breach, wait_for_command(tello, "rc 0 0 0 0", breach)
+
+
+def stale_link(tello, hub, monitor):
+    tello.send_rc_control(0, 40, 0, 0)
+    time.sleep(0.1)
+    hub.stop()
+    # The link counts as stale once the last sample is older than the threshold
+    breach = hub.sample["monotonic"] + monitor.rules["stale_link"]["after"]
+    return breach, wait_for_command(tello, "rc 0 0 0 0", breach)
+
+
+def altitude(tello, hub, monitor):
+    # Climbing forward, one stick input and nothing after it
+    tello.send_rc_control(*monitor.filter_rc(0, 40, 60, 0))
+    with tello.lock:
+        tello.z = monitor.rules["altitude"]["above"] + 10
+    breach = time.monotonic()
+    # The monitor re-sends the setpoint with the climb taken out
+    return breach, wait_for_command(tello, "rc 0 40 0 0", breach)
+
+
+def battery_low(tello, hub, monitor):
+    tello.send_rc_control(*monitor.filter_rc(0, 80, 0, 0))
+    with tello.lock:
+        tello.battery = monitor.rules["battery_low"]["below"] - 1
+    breach = time.monotonic()
+    max_rc = monitor.rules["battery_low"]["max_rc"]
+    return breach, wait_for_command(tello, f"rc 0 {max_rc} 0 0", breach)
+
+
+SCENARIOS = {
+    "battery_critical": battery_critical,
+    "tilt": tilt,
+    "stale_link": stale_link,
+    "altitude": altitude,
+    "battery_low": battery_low,
+}
+
+
+def run_once(name, rate):
+    tello = SimTello(time_scale=0.0)
+    tello.connect()
+    tello.takeoff()
+    hub = TelemetryHub(rate=rate)
+    monitor = SafetyMonitor(lambda: tello)
+    hub.add_listener(monitor.evaluate)
+    hub.start(tello)
+    monitor.start()
+    try:
+        while hub.sample is None:
+            time.sleep(0.001)
+        # Breach at a random point in the telemetry period, not just after a sample
+        time.sleep(random.uniform(0, hub.period))
+        breach, command = SCENARIOS[name](tello, hub, monitor)
+        status = monitor.status()
+        return {
+            "response_ms": round((command - breach) * 1000, 3),
+            "monitor_response_ms": status["response_max_ms"],
+            "tick_mean_us": status["tick_mean_us"],
+            "tick_max_us": status["tick_max_us"],
+            "tick_overruns": status["tick_overruns"],
+        }
+    finally:
+        monitor.stop()
+        hub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Safety monitor response benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=20.0, help="telemetry rate in Hz")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        runs = [run_once(name, args.rate) for _ in range(args.runs)]
+        responses = sorted(run["response_ms"] for run in runs)
+        results[name] = {
+            "runs": runs,
+            "median_response_ms": responses[len(responses) // 2],
+            "max_response_ms": responses[-1],
+        }
+        print(
+            f"{name}: breach to command median {results[name]['median_response_ms']} ms, "
+            f"max {results[name]['max_response_ms']} ms, "
+            f"tick max {max(run['tick_max_us'] for run in runs)} us"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rate_hz": args.rate, "scenarios": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure backend startup: time from launching the process to the first HTTP
+request served, to the drone being ready and to the first video frame streamed.
+
+Runs runBackend against the simulated drone. From the repo root:
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --lazy     # don't warm subsystems at startup
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for(url, start, timeout):
+    """Poll url until it answers. Returns (seconds since start, parsed JSON body)."""
+    while time.monotonic() - start < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return time.monotonic() - start, json.loads(response.read())
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.005)
+    raise TimeoutError(f"{url} didn't answer within {timeout}s")
+
+
+def first_frame(url, start, timeout):
+    """Open the MJPEG stream and return seconds since start when the first JPEG has arrived."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        data = b""
+        while b"\xff\xd9" not in data:
+            chunk = response.read1(65536)
+            if not chunk:
+                raise RuntimeError("Video stream closed before a frame arrived")
+            data += chunk
+    return time.monotonic() - start
+
+
+def run_once(port, lazy, timeout):
+    env = dict(os.environ, TELLO_SIM="1", LAZY_SUBSYSTEMS="1" if lazy else "0")
+    base = f"http://127.0.0.1:{port}"
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "runBackend:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        first_request, _ = wait_for(base + "/ready", start, timeout)
+        while True:
+            tello_ready, status = wait_for(base + "/ready", start, timeout)
+            if status["ready"]:
+                break
+            time.sleep(0.005)
+        frame = first_frame(base + "/video_feed", start, timeout)
+        _, status = wait_for(base + "/ready", start, timeout)
+        return {
+            "first_request_s": round(first_request, 3),
+            "tello_ready_s": round(tello_ready, 3),
+            "first_frame_s": round(frame, 3),
+            "subsystems": {name: s["state"] for name, s in status["subsystems"].items()},
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend startup benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--lazy", action="store_true", help="set LAZY_SUBSYSTEMS=1")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    runs = []
+    for i in range(args.runs):
+        result = run_once(args.port, args.lazy, args.timeout)
+        print(
+            f"run {i}: first request {result['first_request_s']}s, tello ready {result['tello_ready_s']}s, "
+            f"first frame {result['first_frame_s']}s, subsystems {result['subsystems']}"
+        )
+        runs.append(result)
+
+    summary = {
+        key: round(sorted(run[key] for run in runs)[len(runs) // 2], 3)
+        for key in ("first_request_s", "tello_ready_s", "first_frame_s")
+    }
+    print("median:", summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"lazy": args.lazy, "runs": runs, "median": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure how far apart a swarm command reaches each drone, against simulated
+drones. Compares the worker-thread path (callAllDrones) with
+TelloSwarm.broadcast, sent immediately or at a scheduled release time.
+
+From the repo root:
+
+    python -m benchmarks.swarm --drones 50 --runs 200
+    python -m benchmarks.swarm --output swarm.json
+"""
+
+import argparse
+import json
+import time
+
+from dependencies.simTello import SimTello
+from TelloSwarm import TelloSwarm, dispatch_skew
+
+
+def threads(swarm, command):
+    sent = [0.0] * len(swarm)
+
+    def send(i, drone):
+        drone.send_command_without_return(command)
+        sent[i] = time.monotonic()
+
+    swarm.callAllDrones(send)
+    swarm.wait()
+    return dispatch_skew(sent)
+
+
+def broadcast(swarm, command):
+    return swarm.broadcast(command)
+
+
+def scheduled(swarm, command):
+    return swarm.broadcast(command, release_at=time.monotonic() + 0.005)
+
+
+MODES = {"threads": threads, "broadcast": broadcast, "scheduled": scheduled}
+
+
+def summarize(reports, key):
+    values = sorted(report[key] for report in reports)
+    return {
+        "p50_us": values[len(values) // 2],
+        "p99_us": values[min(len(values) - 1, int(len(values) * 0.99))],
+        "max_us": values[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Swarm command dispatch skew benchmark")
+    parser.add_argument("--drones", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--mode", choices=sorted(MODES), action="append")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    swarm = TelloSwarm([SimTello(host=f"sim-{i}") for i in range(args.drones)])
+    results = {}
+    for name in args.mode or MODES:
+        reports = [MODES[name](swarm, "rc 0 0 0 0") for _ in range(args.runs)]
+        # Per broadcast: the spread from first to last drone, and the typical drone's offset
+        results[name] = {
+            "max_skew": summarize(reports, "max_us"),
+            "median_drone_skew": summarize(reports, "p50_us"),
+            "p99_drone_skew": summarize(reports, "p99_us"),
+        }
+        if name == "scheduled":
+            results[name]["release_error"] = summarize(reports, "release_error_us")
+        print(
+            f"{name}: max skew per broadcast p50 {results[name]['max_skew']['p50_us']} us, "
+            f"p99 {results[name]['max_skew']['p99_us']} us, worst {results[name]['max_skew']['max_us']} us"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"drones": args.drones, "runs": args.runs, "modes": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Measure how serving throughput scales with uvicorn workers behind the ingest
+process. For each worker count, starts serveWorkers.py against the simulated
+drone, opens --viewers MJPEG streams spread over several client processes and
+counts the frames delivered, then hammers /snapshot for the same time.
+
+From the repo root:
+
+    python -m benchmarks.workers --workers 1,2,4 --viewers 32
+    python -m benchmarks.workers --workers 1,4 --seconds 20 --output workers.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from benchmarks.startup import wait_for
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def count_frames(url, seconds, counts, index):
+    deadline = time.monotonic() + seconds
+    with urllib.request.urlopen(url, timeout=10) as response:
+        tail = b""
+        while time.monotonic() < deadline:
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            data = tail + chunk
+            counts[index] += data.count(b"--frame")
+            # Keep the end in case a boundary is split across reads
+            tail = data[-7:]
+
+
+def fetch_snapshots(url, seconds, counts, index):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            response.read()
+        counts[index] += 1
+
+
+def client(job, url, threads, seconds):
+    """One client process running `threads` viewers or pollers. Returns their total count."""
+    counts = [0] * threads
+    target = count_frames if job == "video" else fetch_snapshots
+    workers = [threading.Thread(target=target, args=(url, seconds, counts, i)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts)
+
+
+def load(job, url, connections, processes, seconds):
+    per_process = [connections // processes + (i < connections % processes) for i in range(processes)]
+    with multiprocessing.Pool(processes) as pool:
+        totals = pool.starmap(client, [(job, url, n, seconds) for n in per_process if n])
+    return sum(totals) / seconds
+
+
+def run(workers, args):
+    port = args.port
+    base = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "serveWorkers.py", "--sim", "--workers", str(workers), "--port", str(port),
+         "--ingest-address", f"127.0.0.1:{args.ingest_port}"],
+        cwd=REPO_ROOT,
+        env=dict(os.environ, LAZY_SUBSYSTEMS="1"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        start = time.monotonic()
+        while not wait_for(base + "/ready", start, 60)[1]["ready"]:
+            time.sleep(0.05)
+        # Every worker answers /ready on its own, give the rest a moment to connect too
+        time.sleep(2)
+        video_fps = load("video", base + "/video_feed?overlay=false", args.viewers, args.clients, args.seconds)
+        snapshots = load("snapshot", base + "/snapshot?size=half", args.viewers, args.clients, args.seconds)
+    finally:
+        process.terminate()
+        process.wait()
+    return {
+        "workers": workers,
+        "video_frames_per_s": round(video_fps, 1),
+        "per_viewer_fps": round(video_fps / args.viewers, 2),
+        "snapshots_per_s": round(snapshots, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker serving throughput benchmark")
+    parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--viewers", type=int, default=32, help="concurrent streams / pollers")
+    parser.add_argument("--clients", type=int, default=4, help="client processes to spread them over")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--ingest-port", type=int, default=8791)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for workers in (int(n) for n in args.workers.split(",")):
+        result = run(workers, args)
+        results.append(result)
+        print(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "viewers": args.viewers, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dependencies.framePipeline import FramePump, FrameSource
+from dependencies.safetyMonitor import SafetyMonitor
+from dependencies.snapshotCache import SnapshotCache
+from dependencies.telemetry import TelemetryHub
+
+
+class Drone:
+    """
+    Everything the backend keeps per drone: the Tello itself, its frame source
+    and snapshot cache, telemetry, safety monitor, rc state and /ws/move clients.
+    """
+
+    def __init__(self, drone_id, make_tello, registry):
+        self.id = drone_id
+        self.make_tello = make_tello
+        self.registry = registry
+        self.tello = None
+        self.ready_event = threading.Event()
+        self.error = None
+        self.velocity_state = {
+            "left_right_velocity": 0,
+            "forward_backward_velocity": 0,
+            "up_down_velocity": 0,
+            "yaw_velocity": 0,
+        }
+        self.clients = []
+        self.frame_source = FrameSource()
+        self.snapshot_cache = SnapshotCache(self.frame_source)
+        self.telemetry_hub = TelemetryHub()
+        self.safety_monitor = SafetyMonitor(lambda: self.tello)
+        self.telemetry_hub.add_listener(self.safety_monitor.evaluate)
+
+    def connect(self):
+        try:
+            tello = self.make_tello()
+            tello.connect()
+            tello.streamon()
+            self.tello = tello
+            self.frame_source.attach(tello)
+            self.registry.frame_pump.add(self.frame_source)
+            self.telemetry_hub.start(tello)
+            self.safety_monitor.start()
+            print(f"Connected to drone {self.id}.")
+            self.ready_event.set()
+        except Exception as e:
+            print(f"Error initializing drone {self.id}: {e}")
+            self.error = str(e)
+
+    def dispatch(self, name, fn, *args):
+        """Run a blocking drone command on the shared command pool."""
+        return self.registry.commands.submit(self.run_command, name, fn, *args)
+
+    def run_command(self, name, fn, *args):
+        try:
+            response = fn(*args)
+            print(f"Drone {self.id} {name} response: {response}")
+            return response
+        except Exception as e:
+            print(f"Error during {name} on drone {self.id}: {e}")
+
+    def move(self, data):
+        """Update the rc state from a /ws/move message and send it. Returns the new state."""
+        speed = data.get("speed", 60)
+        state = self.velocity_state
+        state["left_right_velocity"] = data.get("left_right_velocity", 0) * speed
+        state["forward_backward_velocity"] = data.get("forward_backward_velocity", 0) * speed
+        state["up_down_velocity"] = data.get("up_down_velocity", 0) * speed
+        state["yaw_velocity"] = data.get("yaw_velocity", 0) * speed
+        self.tello.send_rc_control(
+            *self.safety_monitor.filter_rc(
+                state["left_right_velocity"],
+                state["forward_backward_velocity"],
+                state["up_down_velocity"],
+                state["yaw_velocity"],
+            )
+        )
+        return state
+
+    def close(self):
+        self.registry.frame_pump.remove(self.frame_source)
+        self.telemetry_hub.stop()
+        self.safety_monitor.stop()
+        self.ready_event.clear()
+        if self.tello is not None:
+            self.dispatch("end", self.tello.end)
+
+    def status(self):
+        if self.ready_event.is_set():
+            state = "ready"
+        elif self.error is not None:
+            state = "failed"
+        else:
+            state = "loading"
+        sample = self.telemetry_hub.sample
+        return {
+            "id": self.id,
+            "state": state,
+            "error": self.error,
+            "battery": None if sample is None else sample["battery"],
+            "frames": self.frame_source.seq,
+        }
+
+
+class DroneRegistry:
+    """
+    The drones one backend process serves, by id. Frames from every drone are
+    read on one shared FramePump and blocking commands (connect, takeoff, land,
+    ...) run on one shared thread pool, so adding a drone doesn't add a thread
+    per job.
+    """
+
+    def __init__(self, command_workers=8, frame_workers=4, fps=35):
+        self.drones = {}
+        self.lock = threading.Lock()
+        self.commands = ThreadPoolExecutor(max_workers=command_workers, thread_name_prefix="commands")
+        self.frame_pump = FramePump(fps=fps, workers=frame_workers)
+
+    def add(self, drone_id, make_tello):
+        """Register a drone and start connecting to it. Raises ValueError if the id is taken."""
+        with self.lock:
+            if drone_id in self.drones:
+                raise ValueError(f"Drone {drone_id} already exists")
+            drone = Drone(drone_id, make_tello, self)
+            self.drones[drone_id] = drone
+        self.commands.submit(drone.connect)
+        return drone
+
+    def get(self, drone_id):
+        return self.drones.get(drone_id)
+
+    def remove(self, drone_id):
+        with self.lock:
+            drone = self.drones.pop(drone_id, None)
+        if drone is not None:
+            drone.close()
+        return drone
+
+    def status(self):
+        return {
+            "drones": [drone.status() for drone in list(self.drones.values())],
+            "frame_pump": self.frame_pump.stats(),
+        }
@@ -0,0 +1,168 @@
+import threading
+import time
+
+import cv2
+
+# Fraction of the frame height the target's face should fill
+TARGET_FACE_SIZE = 0.25
+# Proportional gains, rc units per unit of normalised error
+YAW_GAIN = 80
+UP_DOWN_GAIN = 60
+FORWARD_GAIN = 200
+MAX_RC = 50
+# Errors smaller than this are ignored so the drone doesn't twitch around the setpoint
+DEADBAND = 0.05
+
+STAGES = ("capture", "detect", "control", "send", "total")
+
+
+def clamp(value, limit=MAX_RC):
+    return int(max(-limit, min(limit, value)))
+
+
+def rc_from_face(location, frame_shape):
+    """
+    Turn a face box (top, right, bottom, left) into rc velocities
+    (left_right, forward_backward, up_down, yaw) that centre it and hold its size.
+    """
+    height, width = frame_shape[:2]
+    top, right, bottom, left = location
+    x_error = ((left + right) / 2 - width / 2) / (width / 2)
+    y_error = ((top + bottom) / 2 - height / 2) / (height / 2)
+    size_error = TARGET_FACE_SIZE - (bottom - top) / height
+
+    def deadband(error):
+        return 0.0 if abs(error) < DEADBAND else error
+
+    yaw = clamp(YAW_GAIN * deadband(x_error))
+    up_down = clamp(-UP_DOWN_GAIN * deadband(y_error))
+    forward_backward = clamp(FORWARD_GAIN * deadband(size_error))
+    return 0, forward_backward, up_down, yaw
+
+
+class FaceFollower:
+    """
+    Fixed-rate visual servo loop: grab the newest frame, find the target, turn
+    its offset and size into rc commands and send them, every 1/rate seconds.
+
+    Each stage is timed from the moment the frame is grabbed. A cycle whose
+    frame-to-command time goes over `latency_budget` is counted as an overrun.
+    """
+
+    def __init__(self, tello, recognizer, target, rate=10.0, latency_budget=0.15, window=500, rc_filter=None):
+        self.tello = tello
+        self.recognizer = recognizer
+        self.target = target
+        self.period = 1.0 / rate
+        self.latency_budget = latency_budget
+        self.window = window
+        # Optional fn(lr, fb, ud, yaw) -> (lr, fb, ud, yaw) applied before sending, e.g. safety limits
+        self.rc_filter = rc_filter
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.timings = {stage: [] for stage in STAGES}
+        self.cycles = 0
+        self.found = 0
+        self.overruns = 0
+        self.missed_deadlines = 0
+        self.last_rc = (0, 0, 0, 0)
+        self.last_location = None
+        self.last_distance = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def record(self, stage, seconds):
+        samples = self.timings[stage]
+        samples.append(seconds)
+        if len(samples) > self.window:
+            del samples[0]
+
+    def filter(self, rc):
+        return tuple(self.rc_filter(*rc)) if self.rc_filter is not None else rc
+
+    def step(self, frame_read):
+        captured = time.perf_counter()
+        # Same conversion FrameSource applies before any other recognition path sees a frame
+        frame = cv2.cvtColor(frame_read.frame, cv2.COLOR_BGR2RGB)
+        grabbed = time.perf_counter()
+        location, distance = self.recognizer.detect_target(frame, self.target)
+        detected = time.perf_counter()
+        if location is None:
+            rc = (0, 0, 0, 0)
+        else:
+            self.found += 1
+            rc = rc_from_face(location, frame.shape)
+        rc = self.filter(rc)
+        controlled = time.perf_counter()
+        self.tello.send_rc_control(*rc)
+        sent = time.perf_counter()
+
+        self.last_rc = rc
+        self.last_location = location
+        self.last_distance = distance
+        self.cycles += 1
+        self.record("capture", grabbed - captured)
+        self.record("detect", detected - grabbed)
+        self.record("control", controlled - detected)
+        self.record("send", sent - controlled)
+        self.record("total", sent - captured)
+        if sent - captured > self.latency_budget:
+            self.overruns += 1
+
+    def run(self):
+        frame_read = self.tello.get_frame_read()
+        deadline = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.step(frame_read)
+                except Exception as e:
+                    print(f"Error in face follow loop: {e}")
+                    self.tello.send_rc_control(*self.filter((0, 0, 0, 0)))
+                deadline += self.period
+                remaining = deadline - time.monotonic()
+                if remaining < 0:
+                    # Skip the cycles we've already missed instead of running them back to back
+                    self.missed_deadlines += 1
+                    deadline = time.monotonic()
+                elif self.stop_event.wait(remaining):
+                    break
+        finally:
+            self.tello.send_rc_control(*self.filter((0, 0, 0, 0)))
+
+    def stats(self):
+        stages = {}
+        for stage, samples in self.timings.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            stages[stage] = {
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+        return {
+            "target": self.target,
+            "running": self.is_running(),
+            "rate_hz": round(1 / self.period, 2),
+            "latency_budget_ms": self.latency_budget * 1000,
+            "cycles": self.cycles,
+            "found": self.found,
+            "overruns": self.overruns,
+            "missed_deadlines": self.missed_deadlines,
+            "last_rc": self.last_rc,
+            "last_distance": self.last_distance,
+            "stages": stages,
+        }
@@ -1,14 +1,25 @@
+import os
 import cv2
 from dependencies.simple_facerec import SimpleFacerec
 
 class FacialRecognition():
     def __init__(self, known_faces_path):
         self.sfr = SimpleFacerec()
-        self.sfr.load_encoding_images(known_faces_path + "\\")
+        self.sfr.load_encoding_images(os.path.join(known_faces_path, ""))
         self.face_locations = []
         self.face_names = []
     
     def detect_face(self, frame):
         self.face_locations, self.face_names = self.sfr.detect_known_faces(frame)
         return self.face_locations, self.face_names
-    
\ No newline at end of file
+
+    def detect_target(self, frame, person):
+        location, distance = self.sfr.detect_target_face(frame, person)
+        if location is None:
+            self.face_locations, self.face_names = [], []
+        else:
+            self.face_locations, self.face_names = [location], [person]
+        return location, distance
+
+    def known_people(self):
+        return set(self.sfr.known_face_names)
@@ -0,0 +1,390 @@
+"""
+Record a flight (video frames, state packets and sent commands) and play it back.
+
+A recording is a directory of append-only segment files plus one index file per
+segment:
+
+    meta.json            start time and segment list, written on close
+    segment_00000.dat    records: <d t><B kind><I length> then `length` payload bytes
+    segment_00000.idx    one INDEX_DTYPE row per record (t, kind, offset, length)
+
+`t` is seconds since the recording started. Index files are memory-mapped when
+reading, so seeking to a time is a binary search over the segment start times
+and then over that segment's index: O(log n) with nothing loaded up front.
+Finding the newest record of one kind searches a per-kind index of the segment,
+built the first time that kind is asked for, so sparse kinds like commands are
+found just as quickly.
+"""
+
+import bisect
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from dependencies.simTello import TelloStateGetters
+
+FRAME = 1
+STATE = 2
+COMMAND = 3
+
+RECORD_HEADER = struct.Struct("<dBI")
+INDEX_DTYPE = np.dtype([("t", "<f8"), ("kind", "u1"), ("offset", "<u8"), ("length", "<u4")])
+
+# Calls on the drone that change what it does, logged by RecordingTello
+COMMAND_METHODS = {
+    "takeoff", "land", "emergency", "reboot", "initiate_throw_takeoff", "send_rc_control",
+    "move", "move_up", "move_down", "move_left", "move_right", "move_forward", "move_back",
+    "rotate_clockwise", "rotate_counter_clockwise", "flip", "flip_left", "flip_right",
+    "flip_forward", "flip_back", "go_xyz_speed", "set_speed", "set_video_direction",
+    "streamon", "streamoff",
+}
+
+
+class FlightRecorder:
+    """
+    Writes records to segment files, rolling over to a new segment every
+    `segment_bytes`. Safe to call from several threads.
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, jpeg_quality=90):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.jpeg_quality = jpeg_quality
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.start_monotonic = time.monotonic()
+        self.start_wall = time.time()
+        self.segments = []
+        self.data_file = None
+        self.index_file = None
+        self.offset = 0
+        self.counts = {FRAME: 0, STATE: 0, COMMAND: 0}
+        self.capture_stop = threading.Event()
+        self.capture_threads = []
+        self.closed = False
+        self._open_segment()
+
+    def _open_segment(self):
+        if self.data_file is not None:
+            self.data_file.close()
+            self.index_file.close()
+        name = "segment_{:05d}".format(len(self.segments))
+        self.segments.append(name)
+        self.data_file = open(os.path.join(self.directory, name + ".dat"), "ab")
+        self.index_file = open(os.path.join(self.directory, name + ".idx"), "ab")
+        self.offset = 0
+
+    def now(self):
+        return time.monotonic() - self.start_monotonic
+
+    def write(self, kind, payload, t=None):
+        if t is None:
+            t = self.now()
+        with self.lock:
+            if self.closed:
+                return
+            if self.offset and self.offset + len(payload) > self.segment_bytes:
+                self._open_segment()
+            self.data_file.write(RECORD_HEADER.pack(t, kind, len(payload)))
+            self.data_file.write(payload)
+            row = np.array([(t, kind, self.offset, len(payload))], dtype=INDEX_DTYPE)
+            self.index_file.write(row.tobytes())
+            self.offset += RECORD_HEADER.size + len(payload)
+            self.counts[kind] += 1
+
+    def record_frame(self, frame, t=None):
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if ok:
+            self.write(FRAME, buffer.tobytes(), t)
+
+    def record_state(self, state, t=None):
+        self.write(STATE, json.dumps(state).encode(), t)
+
+    def record_command(self, name, args=(), kwargs=None, t=None):
+        command = {"command": name, "args": list(args), "kwargs": kwargs or {}}
+        self.write(COMMAND, json.dumps(command).encode(), t)
+
+    def start_capture(self, tello, fps=30, state_hz=20):
+        """Poll the drone's frames and state on background threads until close()."""
+
+        def capture_frames():
+            frame_read = tello.get_frame_read()
+            last = None
+            while not self.capture_stop.wait(1 / fps):
+                frame = frame_read.frame
+                # BackgroundFrameRead hands out a new array per decoded frame
+                if frame is not None and frame is not last:
+                    self.record_frame(frame)
+                    last = frame
+
+        def capture_state():
+            while not self.capture_stop.wait(1 / state_hz):
+                try:
+                    self.record_state(tello.get_current_state())
+                except Exception as e:
+                    print(f"Error recording state: {e}")
+
+        for target in (capture_frames, capture_state):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.capture_threads.append(thread)
+
+    def close(self):
+        self.capture_stop.set()
+        for thread in self.capture_threads:
+            thread.join()
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.data_file.close()
+            self.index_file.close()
+            meta = {
+                "start_wall": self.start_wall,
+                "duration": self.now(),
+                "segments": self.segments,
+                "counts": {"frames": self.counts[FRAME], "states": self.counts[STATE], "commands": self.counts[COMMAND]},
+            }
+            with open(os.path.join(self.directory, "meta.json"), "w") as f:
+                json.dump(meta, f, indent=2)
+        return meta
+
+
+class RecordingTello:
+    """
+    Wraps a Tello (or stand-in) and logs every command sent through it to a
+    FlightRecorder. Everything else is passed straight through.
+    """
+
+    def __init__(self, tello, recorder):
+        self.tello = tello
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        attr = getattr(self.tello, name)
+        if name not in COMMAND_METHODS or not callable(attr):
+            return attr
+
+        def recorded(*args, **kwargs):
+            self.recorder.record_command(name, args, kwargs)
+            return attr(*args, **kwargs)
+
+        return recorded
+
+
+class FlightRecording:
+    """
+    Read-only view of a recording directory with random access by time.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        meta_path = os.path.join(directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+            names = self.meta["segments"]
+        else:
+            # Recorder didn't close cleanly, use whatever segments are there
+            self.meta = {}
+            names = sorted(n[:-4] for n in os.listdir(directory) if n.endswith(".idx"))
+
+        self.indexes = []
+        self.data_files = []
+        for name in names:
+            idx_path = os.path.join(directory, name + ".idx")
+            rows = os.path.getsize(idx_path) // INDEX_DTYPE.itemsize
+            if rows == 0:
+                continue
+            self.indexes.append(np.memmap(idx_path, dtype=INDEX_DTYPE, mode="r", shape=(rows,)))
+            self.data_files.append(open(os.path.join(directory, name + ".dat"), "rb"))
+        self.segment_starts = [float(index["t"][0]) for index in self.indexes]
+        self.kind_indexes = {}
+        self.read_lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(index) for index in self.indexes)
+
+    @property
+    def duration(self):
+        if not self.indexes:
+            return 0.0
+        return float(self.indexes[-1]["t"][-1])
+
+    def seek(self, t):
+        """Position (segment, row) of the first record at or after t."""
+        segment = max(0, bisect.bisect_right(self.segment_starts, t) - 1)
+        row = int(np.searchsorted(self.indexes[segment]["t"], t, side="left"))
+        if row >= len(self.indexes[segment]) and segment + 1 < len(self.indexes):
+            return segment + 1, 0
+        return segment, row
+
+    def read(self, segment, row):
+        entry = self.indexes[segment][row]
+        with self.read_lock:
+            f = self.data_files[segment]
+            f.seek(int(entry["offset"]) + RECORD_HEADER.size)
+            payload = f.read(int(entry["length"]))
+        return float(entry["t"]), int(entry["kind"]), payload
+
+    def kind_index(self, segment, kind):
+        """(rows, times) of the records of `kind` in a segment, built on first use."""
+        key = (segment, kind)
+        cached = self.kind_indexes.get(key)
+        if cached is None:
+            index = self.indexes[segment]
+            rows = np.flatnonzero(index["kind"] == kind)
+            cached = self.kind_indexes[key] = (rows, np.asarray(index["t"][rows]))
+        return cached
+
+    def latest(self, t, kind):
+        """Position of the last record of `kind` at or before t, or None."""
+        segment = bisect.bisect_right(self.segment_starts, t) - 1
+        while segment >= 0:
+            rows, times = self.kind_index(segment, kind)
+            i = int(np.searchsorted(times, t, side="right")) - 1
+            if i >= 0:
+                return segment, int(rows[i])
+            segment -= 1
+        return None
+
+    def first(self, kind):
+        """Position of the first record of `kind`, or None."""
+        for segment in range(len(self.indexes)):
+            rows, _ = self.kind_index(segment, kind)
+            if len(rows):
+                return segment, int(rows[0])
+        return None
+
+    def iter_from(self, t=0.0, kinds=None):
+        """Yield (t, kind, payload) in order, starting at time t."""
+        segment, row = self.seek(t)
+        while segment < len(self.indexes):
+            index = self.indexes[segment]
+            while row < len(index):
+                if kinds is None or index[row]["kind"] in kinds:
+                    yield self.read(segment, row)
+                row += 1
+            segment += 1
+            row = 0
+
+    def decode(self, kind, payload):
+        if kind == FRAME:
+            return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return json.loads(payload)
+
+    def close(self):
+        for f in self.data_files:
+            f.close()
+
+
+class ReplayFrameRead:
+    """BackgroundFrameRead stand-in returning the recorded frame for the replay clock."""
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.position = None
+        self._frame = None
+
+    @property
+    def stopped(self):
+        return self.replay.finished()
+
+    @property
+    def frame(self):
+        recording = self.replay.recording
+        position = recording.latest(self.replay.now(), FRAME) or recording.first(FRAME)
+        if position is not None and position != self.position:
+            _, kind, payload = recording.read(*position)
+            self._frame = recording.decode(kind, payload)
+            self.position = position
+        return self._frame
+
+    def stop(self):
+        pass
+
+
+class ReplayTello(TelloStateGetters):
+    """
+    Plays a recording back through the Tello interface so the backend, vision
+    and telemetry code can run against it in place of a live drone.
+
+    `speed` is the playback rate (1.0 real time, 4.0 four times faster). Commands
+    sent to it are not flown, only the newest `max_commands` are kept in
+    `sent_commands`.
+    """
+
+    CAMERA_FORWARD = 0
+    CAMERA_DOWNWARD = 1
+
+    def __init__(self, directory, speed=1.0, start=0.0, loop=False, max_commands=1000):
+        self.recording = FlightRecording(directory)
+        self.speed = speed
+        self.offset = start
+        self.loop = loop
+        self.started = None
+        self.frame_read = None
+        self.sent_commands = deque(maxlen=max_commands)
+
+    def now(self):
+        """Position in the recording, in recording seconds."""
+        if self.started is None:
+            return self.offset
+        t = self.offset + (time.monotonic() - self.started) * self.speed
+        if self.loop and self.recording.duration > 0:
+            t %= self.recording.duration
+        return t
+
+    def finished(self):
+        return not self.loop and self.now() > self.recording.duration
+
+    def seek(self, t):
+        self.offset = t
+        if self.started is not None:
+            self.started = time.monotonic()
+
+    def connect(self, wait_for_state=True):
+        if len(self.recording) == 0:
+            raise RuntimeError(f"Recording {self.recording.directory} is empty")
+
+    def streamon(self):
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def streamoff(self):
+        pass
+
+    def end(self):
+        self.recording.close()
+
+    def get_frame_read(self):
+        if self.frame_read is None:
+            self.frame_read = ReplayFrameRead(self)
+        return self.frame_read
+
+    def get_current_state(self):
+        # Before the first state packet, report the first one
+        position = self.recording.latest(self.now(), STATE) or self.recording.first(STATE)
+        if position is None:
+            return {}
+        _, kind, payload = self.recording.read(*position)
+        return self.recording.decode(kind, payload)
+
+    def query_sdk_version(self):
+        return "replay"
+
+    def __getattr__(self, name):
+        # Flight commands are accepted and logged, never flown
+        if name in COMMAND_METHODS or name.startswith("send_"):
+            def ignored(*args, **kwargs):
+                self.sent_commands.append((self.now(), name, args))
+                return True
+
+            return ignored
+        raise AttributeError(name)
@@ -0,0 +1,240 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import cv2
+
+
+class FrameSource:
+    """
+    Pulls frames from the drone on one thread and hands them out with a sequence
+    number, so every viewer and worker shares one read (and one colour
+    conversion) per frame instead of doing its own.
+    """
+
+    def __init__(self, fps=35):
+        self.period = 1.0 / fps
+        self.condition = threading.Condition()
+        self.seq = 0
+        self.frame = None
+        self.timestamp = None
+        self.frame_read = None
+        self.last_raw = None
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def attach(self, tello):
+        """Read from this drone's stream. Call poll() yourself, or start() to poll on a thread."""
+        self.frame_read = tello.get_frame_read()
+        self.last_raw = None
+
+    def start(self, tello):
+        self.attach(tello)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def poll(self):
+        """Publish the stream's current frame if it's a new one. Returns True if it was."""
+        raw = self.frame_read.frame
+        if raw is None or raw is self.last_raw:
+            return False
+        self.last_raw = raw
+        # Same conversion the stream has always applied before drawing and encoding
+        frame = cv2.cvtColor(raw, cv2.COLOR_BGR2RGB)
+        with self.condition:
+            self.seq += 1
+            self.frame = frame
+            self.timestamp = time.time()
+            self.condition.notify_all()
+        return True
+
+    def run(self):
+        while not self.stop_event.wait(self.period):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error reading frame: {e}")
+                time.sleep(1)
+
+    def latest(self):
+        with self.condition:
+            return self.seq, self.frame, self.timestamp
+
+    def wait_for_frame(self, after_seq, timeout=1.0):
+        """
+        Block until there's a frame newer than after_seq. Returns (seq, frame, timestamp),
+        with frame None if nothing arrived before the timeout.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > after_seq, timeout)
+            if self.seq <= after_seq:
+                return after_seq, None, None
+            return self.seq, self.frame, self.timestamp
+
+
+class FramePump:
+    """
+    Polls any number of FrameSources from one scheduling thread, with the reads
+    and colour conversions done on a shared pool of workers rather than a
+    thread per drone.
+    """
+
+    def __init__(self, fps=35, workers=4):
+        self.period = 1.0 / fps
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frames")
+        self.sources = []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.ticks = 0
+        self.missed_deadlines = 0
+
+    def add(self, source):
+        with self.lock:
+            self.sources.append(source)
+            if self.thread is None or not self.thread.is_alive():
+                self.stop_event.clear()
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def remove(self, source):
+        with self.lock:
+            if source in self.sources:
+                self.sources.remove(source)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def poll(self, source):
+        try:
+            source.poll()
+        except Exception as e:
+            print(f"Error reading frame: {e}")
+
+    def run(self):
+        deadline = time.monotonic()
+        while not self.stop_event.is_set():
+            with self.lock:
+                sources = list(self.sources)
+            # Wait for the whole tick so a slow one doesn't pile work up in the pool
+            wait([self.pool.submit(self.poll, source) for source in sources])
+            self.ticks += 1
+            deadline += self.period
+            remaining = deadline - time.monotonic()
+            if remaining < 0:
+                self.missed_deadlines += 1
+                deadline = time.monotonic()
+            elif self.stop_event.wait(remaining):
+                break
+
+    def stats(self):
+        return {
+            "sources": len(self.sources),
+            "workers": self.pool._max_workers,
+            "ticks": self.ticks,
+            "missed_deadlines": self.missed_deadlines,
+        }
+
+
+class DetectionWorker:
+    """
+    Runs the active detector on the newest frame from a FrameSource, at its own
+    pace, and publishes the result tagged with the frame's sequence number.
+
+    `get_detector` returns (detector_id, fn) or None when detection is off.
+    fn(frame) returns (boxes, names, distances) with boxes as (x1, y1, x2, y2).
+
+    With a `gate` (see motionGate.MotionGate) frames it judges unchanged reuse
+    the last result instead of running fn, republished under the new frame's
+    seq with "reused" set. Detectors in `ungated` always run.
+    """
+
+    def __init__(self, frame_source, get_detector, gate=None, ungated=()):
+        self.frame_source = frame_source
+        self.get_detector = get_detector
+        self.gate = gate
+        self.ungated = set(ungated)
+        self.result = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.inferences = 0
+        self.reused = 0
+        self.inference_seconds = 0.0
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def publish(self, result):
+        self.result = result
+
+    def run(self):
+        last_seq = 0
+        while not self.stop_event.is_set():
+            detector = self.get_detector()
+            if detector is None:
+                if self.result is not None:
+                    self.publish(None)
+                self.stop_event.wait(0.05)
+                continue
+            detector_id, detect = detector
+            seq, frame, timestamp = self.frame_source.wait_for_frame(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            last_seq = seq
+            previous = self.result
+            if previous is None or previous["detector"] != detector_id:
+                # Nothing to reuse, and the gate's reference belongs to the old detector
+                previous = None
+                if self.gate is not None:
+                    self.gate.reset()
+            if self.gate is not None and detector_id not in self.ungated and not self.gate.should_run(frame):
+                if previous is not None:
+                    self.reused += 1
+                    self.publish({**previous, "seq": seq, "t": round(timestamp, 3), "reused": True})
+                    continue
+            start = time.perf_counter()
+            try:
+                boxes, names, distances = detect(frame)
+            except Exception as e:
+                print(f"Error in {detector_id} detection: {e}")
+                if self.gate is not None:
+                    self.gate.reset()
+                self.stop_event.wait(0.5)
+                continue
+            elapsed = time.perf_counter() - start
+            self.inferences += 1
+            self.inference_seconds += elapsed
+            self.publish({
+                "seq": seq,
+                "t": round(timestamp, 3),
+                "detector": detector_id,
+                "boxes": [[int(v) for v in box] for box in boxes],
+                "names": list(names),
+                "distances": [None if d is None else round(float(d), 4) for d in distances],
+                "ms": round(elapsed * 1000, 2),
+                "reused": False,
+            })
+
+    def stats(self):
+        frames = self.inferences + self.reused
+        mean = self.inference_seconds / self.inferences if self.inferences else 0.0
+        return {
+            "frames": frames,
+            "inferences": self.inferences,
+            "reused": self.reused,
+            "skip_rate": round(self.reused / frames, 4) if frames else 0.0,
+            "inference_ms_mean": round(mean * 1000, 3),
+            "inference_s_total": round(self.inference_seconds, 3),
+            # What the reused frames would have cost at the average inference time
+            "inference_s_saved": round(mean * self.reused, 3),
+            "gate": self.gate.stats() if self.gate is not None else None,
+        }
@@ -0,0 +1,74 @@
+import threading
+import time
+
+
+class Subsystem:
+    """
+    Something expensive to set up (face recognition gallery, cascade models, ...)
+    that's loaded the first time it's needed, or warmed on a background thread,
+    instead of at import time.
+
+    state goes idle -> loading -> ready (or failed). get() loads synchronously if
+    needed; warm() starts loading in the background and returns straight away.
+    A failed load isn't retried by warm(), which may be called on every frame,
+    only by retry() or get().
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.state = "idle"
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self.ready_at = None
+
+    def get(self):
+        if self.state == "ready":
+            return self.value
+        with self.lock:
+            if self.state != "ready":
+                self.state = "loading"
+                start = time.monotonic()
+                try:
+                    self.value = self.loader()
+                except Exception as e:
+                    self.state = "failed"
+                    self.error = str(e)
+                    print(f"Error loading {self.name}: {e}")
+                    raise
+                self.load_seconds = time.monotonic() - start
+                self.ready_at = time.time()
+                self.error = None
+                self.state = "ready"
+        return self.value
+
+    def warm(self):
+        """Start loading on a background thread, unless it's loading, loaded or has failed."""
+        if self.state == "idle":
+            self.state = "loading"
+
+            def load():
+                try:
+                    self.get()
+                except Exception:
+                    pass
+
+            threading.Thread(target=load, daemon=True).start()
+
+    def retry(self):
+        """Like warm(), but also tries again after a failure."""
+        if self.state == "failed":
+            self.state = "idle"
+        self.warm()
+
+    def is_ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        return {
+            "state": self.state,
+            "load_seconds": None if self.load_seconds is None else round(self.load_seconds, 3),
+            "error": self.error,
+        }
@@ -0,0 +1,192 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class LoopWatchdog:
+    """
+    Measures how late the event loop runs a heartbeat that sleeps `interval`
+    seconds at a time. A watcher thread checks the heartbeat too, and once it's
+    more than `threshold` seconds late grabs the loop thread's stack, which shows
+    the code that's blocking it while it's still doing so.
+
+    Stalls are attributed to the route whose endpoint is on that stack. A stall
+    inside C code that holds the GIL can only be seen after it ends, so it's
+    counted without a stack.
+    """
+
+    def __init__(self, interval=0.05, threshold=0.1, window=1200, max_stalls=50):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags = deque(maxlen=window)
+        self.stalls = deque(maxlen=max_stalls)
+        self.blocked_by_handler = {}
+        self.stall_count = 0
+        self.lock = threading.Lock()
+        self.current_stall = None
+        self.handler_codes = {}
+        self.loop_thread = None
+        self.last_beat = None
+        self.task = None
+        self.stop_event = threading.Event()
+
+    def start(self, handler_codes=None):
+        """Call from the event loop. handler_codes maps endpoint code objects to route paths."""
+        self.handler_codes = handler_codes or {}
+        self.loop_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.task = asyncio.get_running_loop().create_task(self.heartbeat())
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.task is not None:
+            self.task.cancel()
+
+    async def heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.lags.append(lag)
+            with self.lock:
+                stall = self.current_stall
+                self.current_stall = None
+                self.last_beat = now
+            if stall is not None:
+                stall["duration_ms"] = round(lag * 1000, 3)
+                handler = stall["handler"]
+                self.blocked_by_handler[handler] = self.blocked_by_handler.get(handler, 0.0) + lag
+            elif lag > self.threshold:
+                # Over before the watcher got a look at it
+                self.record_stall(now - lag, None)["duration_ms"] = round(lag * 1000, 3)
+
+    def watch(self):
+        while not self.stop_event.wait(self.interval / 2):
+            with self.lock:
+                if self.current_stall is not None:
+                    continue
+                blocked = time.monotonic() - self.last_beat - self.interval
+                if blocked <= self.threshold:
+                    continue
+                frame = sys._current_frames().get(self.loop_thread)
+                self.current_stall = self.record_stall(self.last_beat + self.interval, frame)
+
+    def record_stall(self, started, frame):
+        handler = None
+        stack = None
+        if frame is not None:
+            summary = traceback.extract_stack(frame)
+            stack = [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in summary[-15:]]
+            # The outermost endpoint on the stack is the route that's blocking
+            while frame is not None:
+                handler = self.handler_codes.get(frame.f_code, handler)
+                frame = frame.f_back
+        stall = {
+            "t": round(time.time() - (time.monotonic() - started), 3),
+            "handler": handler,
+            "duration_ms": None,
+            "stack": stack,
+        }
+        self.stall_count += 1
+        self.stalls.append(stall)
+        return stall
+
+    def stats(self):
+        lags = list(self.lags)
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag": summarize(lags) if lags else None,
+            "stall_count": self.stall_count,
+            "blocked_ms_by_handler": {
+                str(handler): round(seconds * 1000, 3) for handler, seconds in self.blocked_by_handler.items()
+            },
+            "stalls": list(self.stalls)[-10:],
+        }
+
+
+class HandlerTimings:
+    """Recent execution times per route, bounded to `window` samples each."""
+
+    def __init__(self, window=500):
+        self.window = window
+        self.samples = {}
+
+    def record(self, name, seconds):
+        samples = self.samples.setdefault(name, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def stats(self):
+        return {name: summarize(samples) for name, samples in list(self.samples.items()) if samples}
+
+
+def route_name(scope, kind):
+    # The router fills in the matched route, unmatched paths share one bucket
+    route = scope.get("route")
+    return f"{kind} {route.path}" if route is not None else "unmatched"
+
+
+class HandlerTimingMiddleware:
+    """
+    ASGI middleware recording how long each HTTP handler takes to start its
+    response. Streaming responses are timed to their first byte, not their end.
+
+    Websocket handlers are timed per message, from receiving it to asking for
+    the next one, under "WS <path>". Websockets that only send aren't timed.
+    """
+
+    def __init__(self, app, timings):
+        self.app = app
+        self.timings = timings
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            await self.app(scope, self.timed_receive(scope, receive), send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        recorded = False
+
+        async def timed_send(message):
+            nonlocal recorded
+            if message["type"] == "http.response.start" and not recorded:
+                recorded = True
+                self.timings.record(route_name(scope, scope["method"]), time.perf_counter() - start)
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
+
+    def timed_receive(self, scope, receive):
+        received = None
+
+        async def receive_next():
+            nonlocal received
+            # Asking for the next message means the handler is done with the last one
+            if received is not None:
+                self.timings.record(route_name(scope, "WS"), time.perf_counter() - received)
+                received = None
+            message = await receive()
+            if message["type"] == "websocket.receive":
+                received = time.perf_counter()
+            return message
+
+        return receive_next
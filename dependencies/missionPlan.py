@@ -0,0 +1,319 @@
+import threading
+import time
+import operator
+
+# Step types and the fields each one needs
+MOVE_DIRECTIONS = ("up", "down", "left", "right", "forward", "back")
+FLIP_DIRECTIONS = ("l", "r", "f", "b")
+RC_FIELDS = ("left_right", "forward_backward", "up_down", "yaw")
+STEP_TYPES = ("takeoff", "land", "move", "rotate", "flip", "wait", "rc", "wait_until", "check")
+# Steps that fly the drone, refused while the interlock says so
+FLIGHT_STEPS = ("takeoff", "move", "rotate", "flip", "rc")
+
+# Same names as djitellopy's state packet
+STATE_FIELDS = (
+    "mid", "x", "y", "z", "pitch", "roll", "yaw", "vgx", "vgy", "vgz", "templ",
+    "temph", "tof", "h", "bat", "baro", "time", "agx", "agy", "agz",
+)
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Sleep until this close to a deadline, then spin for the rest
+SPIN_WINDOW = 0.002
+CONDITION_POLL = 0.02
+
+
+class MissionError(ValueError):
+    """
+    Raised when a mission plan doesn't validate. `problems` holds one message per bad field.
+    """
+
+    def __init__(self, problems):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_condition(cond, where, problems):
+    if not isinstance(cond, dict):
+        problems.append(f"{where}: condition must be an object")
+        return
+    if cond.get("field") not in STATE_FIELDS:
+        problems.append(f"{where}: unknown telemetry field {cond.get('field')!r}")
+    if cond.get("op") not in OPERATORS:
+        problems.append(f"{where}: op must be one of {', '.join(OPERATORS)}")
+    if not _is_number(cond.get("value")):
+        problems.append(f"{where}: value must be a number")
+
+
+def validate_plan(plan):
+    """
+    Check a whole mission plan before anything flies. Returns the list of steps,
+    or raises MissionError listing every problem found.
+
+    A plan looks like:
+        {"name": "demo", "steps": [
+            {"type": "takeoff"},
+            {"type": "move", "direction": "up", "distance": 50},
+            {"type": "rotate", "degrees": -90},
+            {"type": "rc", "forward_backward": 30, "duration": 2.0},
+            {"type": "wait_until", "field": "h", "op": ">=", "value": 100, "timeout": 5},
+            {"type": "land", "at": 20.0}
+        ]}
+
+    Every step may also have:
+        at: start time in seconds from mission start (default: when the previous step ends)
+        when: {"field", "op", "value"} - the step is skipped if this is false
+    """
+    problems = []
+    if not isinstance(plan, dict):
+        raise MissionError(["plan must be an object"])
+    steps = plan.get("steps")
+    if not isinstance(steps, list) or not steps:
+        raise MissionError(["plan needs a non-empty 'steps' list"])
+
+    last_at = 0.0
+    for i, step in enumerate(steps):
+        where = f"step {i}"
+        if not isinstance(step, dict):
+            problems.append(f"{where}: must be an object")
+            continue
+        kind = step.get("type")
+        where = f"step {i} ({kind})"
+        if kind not in STEP_TYPES:
+            problems.append(f"step {i}: unknown type {kind!r}")
+            continue
+
+        if "at" in step:
+            if not _is_number(step["at"]) or step["at"] < 0:
+                problems.append(f"{where}: 'at' must be a number >= 0")
+            elif step["at"] < last_at:
+                problems.append(f"{where}: 'at' goes backwards in time")
+            else:
+                last_at = step["at"]
+        if "when" in step:
+            _check_condition(step["when"], where + " when", problems)
+
+        if kind == "move":
+            if step.get("direction") not in MOVE_DIRECTIONS:
+                problems.append(f"{where}: direction must be one of {', '.join(MOVE_DIRECTIONS)}")
+            distance = step.get("distance")
+            if not isinstance(distance, int) or not 20 <= distance <= 500:
+                problems.append(f"{where}: distance must be an integer from 20 to 500 cm")
+        elif kind == "rotate":
+            degrees = step.get("degrees")
+            if not isinstance(degrees, int) or degrees == 0 or not -360 <= degrees <= 360:
+                problems.append(f"{where}: degrees must be a non-zero integer from -360 to 360")
+        elif kind == "flip":
+            if step.get("direction") not in FLIP_DIRECTIONS:
+                problems.append(f"{where}: direction must be one of {', '.join(FLIP_DIRECTIONS)}")
+        elif kind == "wait":
+            if not _is_number(step.get("seconds")) or step["seconds"] < 0:
+                problems.append(f"{where}: seconds must be a number >= 0")
+        elif kind == "rc":
+            for field in RC_FIELDS:
+                value = step.get(field, 0)
+                if not _is_number(value) or not -100 <= value <= 100:
+                    problems.append(f"{where}: {field} must be from -100 to 100")
+            if not _is_number(step.get("duration")) or step["duration"] <= 0:
+                problems.append(f"{where}: duration must be a number > 0")
+        elif kind in ("wait_until", "check"):
+            _check_condition(step, where, problems)
+            if kind == "wait_until":
+                timeout = step.get("timeout", 10)
+                if not _is_number(timeout) or timeout <= 0:
+                    problems.append(f"{where}: timeout must be a number > 0")
+
+    if problems:
+        raise MissionError(problems)
+    return steps
+
+
+class MissionAborted(Exception):
+    pass
+
+
+class MissionRunner:
+    """
+    Runs a validated plan against a Tello (or SimTello) on its own thread.
+
+    Step start times are scheduled on the monotonic clock, relative to the
+    mission start, so a late step doesn't push every step after it back.
+    Each step reports a progress event through `on_event` with how far its
+    actual start was from the scheduled one (error_ms).
+
+    `rc_filter` is an optional fn(lr, fb, ud, yaw) -> (lr, fb, ud, yaw) applied
+    to every rc command, e.g. safety limits. `interlock` is an optional fn()
+    returning why flying is blocked, or None; flight steps abort while it does.
+    """
+
+    def __init__(self, tello, plan, on_event=None, rc_filter=None, interlock=None):
+        self.tello = tello
+        self.name = plan.get("name", "mission")
+        self.steps = validate_plan(plan)
+        self.on_event = on_event
+        self.rc_filter = rc_filter
+        self.interlock = interlock
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.state = "pending"
+        self.events = []
+        self.start_time = None
+
+    def is_busy(self):
+        return self.state in ("pending", "running")
+
+    def start(self):
+        # Running from here on, so nothing can see it pending and start a second mission
+        self.state = "running"
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def emit(self, event):
+        event["mission"] = self.name
+        self.events.append(event)
+        if self.on_event is not None:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Error reporting mission event: {e}")
+
+    def sleep_until(self, deadline):
+        """Sleep to within SPIN_WINDOW of the deadline, then spin. Raises if stopped."""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if remaining > SPIN_WINDOW:
+                if self.stop_event.wait(remaining - SPIN_WINDOW):
+                    raise MissionAborted()
+            elif self.stop_event.is_set():
+                raise MissionAborted()
+
+    def send_rc(self, left_right, forward_backward, up_down, yaw):
+        rc = (left_right, forward_backward, up_down, yaw)
+        if self.rc_filter is not None:
+            rc = self.rc_filter(*rc)
+        self.tello.send_rc_control(*rc)
+
+    def condition_met(self, cond):
+        value = self.tello.get_state_field(cond["field"])
+        return OPERATORS[cond["op"]](value, cond["value"])
+
+    def execute(self, step, started):
+        kind = step["type"]
+        tello = self.tello
+        if kind in FLIGHT_STEPS and self.interlock is not None:
+            reason = self.interlock()
+            if reason:
+                raise MissionAborted(f"safety interlock: {reason}")
+        if kind == "takeoff":
+            tello.takeoff()
+        elif kind == "land":
+            tello.land()
+        elif kind == "move":
+            tello.move(step["direction"], step["distance"])
+        elif kind == "rotate":
+            if step["degrees"] > 0:
+                tello.rotate_clockwise(step["degrees"])
+            else:
+                tello.rotate_counter_clockwise(-step["degrees"])
+        elif kind == "flip":
+            tello.flip(step["direction"])
+        elif kind == "wait":
+            self.sleep_until(started + step["seconds"])
+        elif kind == "rc":
+            self.send_rc(*(int(step.get(field, 0)) for field in RC_FIELDS))
+            try:
+                self.sleep_until(started + step["duration"])
+            finally:
+                self.send_rc(0, 0, 0, 0)
+        elif kind == "wait_until":
+            deadline = started + step.get("timeout", 10)
+            while not self.condition_met(step):
+                if time.monotonic() >= deadline:
+                    raise MissionAborted(f"timed out waiting for {step['field']} {step['op']} {step['value']}")
+                self.sleep_until(min(deadline, time.monotonic() + CONDITION_POLL))
+        elif kind == "check":
+            if not self.condition_met(step):
+                raise MissionAborted(f"check failed: {step['field']} {step['op']} {step['value']}")
+
+    def run(self):
+        self.state = "running"
+        self.start_time = time.monotonic()
+        self.emit({"type": "start", "steps": len(self.steps)})
+        next_start = self.start_time
+        index = 0
+        try:
+            for index, step in enumerate(self.steps):
+                scheduled = self.start_time + step["at"] if "at" in step else next_start
+                self.sleep_until(scheduled)
+                started = time.monotonic()
+
+                if "when" in step and not self.condition_met(step["when"]):
+                    self.emit({
+                        "type": "step",
+                        "index": index,
+                        "step": step["type"],
+                        "status": "skipped",
+                        "scheduled": round(scheduled - self.start_time, 4),
+                        "error_ms": round((started - scheduled) * 1000, 3),
+                    })
+                    next_start = started
+                    continue
+
+                self.execute(step, started)
+                finished = time.monotonic()
+                self.emit({
+                    "type": "step",
+                    "index": index,
+                    "step": step["type"],
+                    "status": "done",
+                    "scheduled": round(scheduled - self.start_time, 4),
+                    "started": round(started - self.start_time, 4),
+                    "error_ms": round((started - scheduled) * 1000, 3),
+                    "duration": round(finished - started, 4),
+                })
+                next_start = finished
+            self.state = "finished"
+        except MissionAborted as e:
+            self.state = "aborted"
+            self.emit({"type": "aborted", "index": index, "reason": str(e) or "stopped"})
+            try:
+                self.send_rc(0, 0, 0, 0)
+            except Exception as e:
+                print(f"Error stopping drone after abort: {e}")
+        except Exception as e:
+            self.state = "failed"
+            self.emit({"type": "failed", "index": index, "reason": str(e)})
+            try:
+                self.send_rc(0, 0, 0, 0)
+            except Exception as e:
+                print(f"Error stopping drone after failure: {e}")
+
+        errors = [abs(e["error_ms"]) for e in self.events if e["type"] == "step"]
+        self.emit({
+            "type": "end",
+            "state": self.state,
+            "elapsed": round(time.monotonic() - self.start_time, 4),
+            "max_error_ms": max(errors) if errors else 0.0,
+            "mean_error_ms": round(sum(errors) / len(errors), 3) if errors else 0.0,
+        })
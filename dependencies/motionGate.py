@@ -0,0 +1,67 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap check for whether a frame is different enough from the last one
+    inference ran on to be worth running it again. Frames are shrunk to a small
+    grayscale thumbnail, which averages away sensor noise, and the change is the
+    fraction of thumbnail pixels that moved by more than `pixel_threshold`.
+    Counting changed pixels rather than averaging the difference keeps a face
+    moving across a still background from being lost in the mean. Comparing
+    against the last inferred frame rather than the previous one means slow
+    drift still adds up to a rerun.
+
+    Inference also reruns once the last result is `max_age` seconds old, so a
+    person walking into a still shot is never missed for long.
+    """
+
+    def __init__(self, threshold=0.01, max_age=1.0, pixel_threshold=12, size=(32, 24)):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.max_age = max_age
+        self.size = size
+        self.reference = None
+        self.reference_time = 0.0
+        self.last_change = None
+        self.checks = 0
+        self.skipped = 0
+        self.check_seconds = 0.0
+
+    def reset(self):
+        """Forget the reference frame, e.g. when the detector changes."""
+        self.reference = None
+
+    def should_run(self, frame):
+        start = time.perf_counter()
+        now = time.monotonic()
+        # Shrinking before the grayscale conversion leaves it almost nothing to convert
+        thumbnail = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_RGB2GRAY)
+        run = self.reference is None or now - self.reference_time >= self.max_age
+        if self.reference is not None:
+            changed = cv2.absdiff(thumbnail, self.reference) > self.pixel_threshold
+            self.last_change = float(np.mean(changed))
+            run = run or self.last_change > self.threshold
+        if run:
+            self.reference = thumbnail
+            self.reference_time = now
+        else:
+            self.skipped += 1
+        self.checks += 1
+        self.check_seconds += time.perf_counter() - start
+        return run
+
+    def stats(self):
+        return {
+            "threshold": self.threshold,
+            "max_age_s": self.max_age,
+            "pixel_threshold": self.pixel_threshold,
+            "checks": self.checks,
+            "skipped": self.skipped,
+            "skip_rate": round(self.skipped / self.checks, 4) if self.checks else 0.0,
+            "last_change": None if self.last_change is None else round(self.last_change, 4),
+            "check_ms_mean": round(self.check_seconds / self.checks * 1000, 4) if self.checks else 0.0,
+        }
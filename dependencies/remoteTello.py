@@ -0,0 +1,259 @@
+"""
+The command side of the ingest process (see ingest.py). CommandServer runs in
+the ingest process next to the real drone, RemoteTello stands in for the drone
+in each backend worker: state and frames are read from the shared memory rings,
+commands are forwarded over a multiprocessing.connection channel.
+
+Messages are (method, args, kwargs) tuples, answered with ("ok", result) or
+("error", exception type name, message). The channel unpickles what it's sent,
+so both ends share a secret key, hex encoded in TELLO_INGEST_KEY. serveWorkers.py
+makes a new random one every run.
+"""
+
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from dependencies.sharedRing import FRAME_RING, STATE_RING, FrameRing, RingFrameRead, StateRing
+from dependencies.simTello import TelloStateGetters
+
+AUTHKEY_ENV = "TELLO_INGEST_KEY"
+
+
+def new_authkey():
+    return os.urandom(32)
+
+
+def authkey_from_env():
+    """The shared key from TELLO_INGEST_KEY. There's deliberately no default to fall back on."""
+    value = os.environ.get(AUTHKEY_ENV)
+    if not value:
+        raise RuntimeError(f"{AUTHKEY_ENV} isn't set, start the ingest process and workers through serveWorkers.py")
+    return bytes.fromhex(value)
+
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+class CommandServer:
+    """
+    Accepts worker connections and runs their calls on the drone, one thread per
+    connection so a slow takeoff on one doesn't hold up rc input on another.
+    rc setpoints go through the safety monitor before they reach the drone.
+    """
+
+    def __init__(self, tello, safety_monitor, address, authkey):
+        self.tello = tello
+        self.safety_monitor = safety_monitor
+        self.listener = Listener(parse_address(address), authkey=authkey)
+        self.calls = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.accept, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.listener.close()
+
+    def accept(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except OSError:
+                return
+            except Exception as e:
+                # Bad authkey or a client that went away mid-handshake
+                print(f"Rejected ingest connection: {e}")
+                continue
+            threading.Thread(target=self.serve, args=(connection,), daemon=True).start()
+
+    def call(self, method, args, kwargs):
+        if method == "safety_status":
+            return self.safety_monitor.status()
+        if method == "safety_configure":
+            return self.safety_monitor.configure(*args)
+        if method == "safety_reset":
+            return self.safety_monitor.reset()
+        if method == "safety_latched":
+            return self.safety_monitor.latched
+        if method.startswith("_"):
+            raise AttributeError(f"Can't call {method} remotely")
+        if method == "send_rc_control":
+            args = self.safety_monitor.filter_rc(*args)
+        return getattr(self.tello, method)(*args, **kwargs)
+
+    def serve(self, connection):
+        with connection:
+            while True:
+                try:
+                    method, args, kwargs = connection.recv()
+                except (EOFError, OSError):
+                    return
+                self.calls += 1
+                try:
+                    reply = ("ok", self.call(method, args, kwargs))
+                except Exception as e:
+                    reply = ("error", type(e).__name__, str(e))
+                try:
+                    connection.send(reply)
+                except Exception as e:
+                    connection.send(("error", type(e).__name__, str(e)))
+
+
+class RemoteError(Exception):
+    """A call that failed in the ingest process, with the original exception type's name."""
+
+    def __init__(self, kind, message):
+        super().__init__(f"{kind}: {message}")
+        self.kind = kind
+        self.message = message
+
+
+class RemoteTello(TelloStateGetters):
+    """
+    Tello interface for a backend worker. Getters read the state ring, frames
+    come from the frame ring and every other method is forwarded to the drone
+    in the ingest process.
+    """
+
+    CAMERA_FORWARD = 0
+    CAMERA_DOWNWARD = 1
+
+    def __init__(self, address, frame_ring=FRAME_RING, state_ring=STATE_RING, authkey=None):
+        self.address = parse_address(address)
+        self.authkey = authkey if authkey is not None else authkey_from_env()
+        self.frame_ring_name = frame_ring
+        self.state_ring_name = state_ring
+        self.frame_ring = None
+        self.state_ring = None
+        self.frame_read = None
+        # Idle connections, so calls from different threads don't queue behind each other
+        self.connections = queue.LifoQueue()
+        self.last_seq = None
+        self.last_state = None
+
+    def call(self, method, *args, **kwargs):
+        try:
+            connection = self.connections.get_nowait()
+        except queue.Empty:
+            connection = Client(self.address, authkey=self.authkey)
+        try:
+            connection.send((method, args, kwargs))
+            reply = connection.recv()
+        except Exception:
+            connection.close()
+            raise
+        self.connections.put(connection)
+        if reply[0] == "error":
+            raise RemoteError(reply[1], reply[2])
+        return reply[1]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def forward(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+
+        return forward
+
+    def connect(self, wait_for_state=True):
+        self.call("connect")
+        self.state_ring = StateRing.open(self.state_ring_name)
+        if wait_for_state:
+            while self.state_ring.seq == 0:
+                time.sleep(0.01)
+
+    def get_frame_read(self):
+        if self.frame_read is None:
+            self.frame_ring = FrameRing.open(self.frame_ring_name)
+            self.frame_read = RingFrameRead(self.frame_ring)
+        return self.frame_read
+
+    def get_current_state(self):
+        seq, state = self.state_ring.latest()
+        # Same dict until a new packet arrives, like djitellopy, so staleness can be told apart
+        if seq != self.last_seq:
+            self.last_seq = seq
+            self.last_state = state
+        return self.last_state
+
+
+class RemoteSafetyMonitor:
+    """
+    The safety monitor as seen from a backend worker. The real one runs in the
+    ingest process, where it also filters every rc setpoint, so filtering here
+    passes values through untouched.
+
+    Latching happens over there too. Telemetry samples are used as a tick to ask
+    for it every `latch_poll` seconds, so latch listeners in this worker hear
+    about it.
+    """
+
+    def __init__(self, get_tello, latch_poll=0.1):
+        self.get_tello = get_tello
+        self.latch_poll = latch_poll
+        self.latch_listeners = []
+        self.last_poll = 0.0
+        self.was_latched = None
+
+    def call(self, method, *args):
+        tello = self.get_tello()
+        if tello is None:
+            raise RuntimeError("Tello not initialized")
+        return tello.call(method, *args)
+
+    @property
+    def latched(self):
+        return self.call("safety_latched")
+
+    def add_latch_listener(self, fn):
+        self.latch_listeners.append(fn)
+
+    def notify_latched(self, action):
+        for fn in list(self.latch_listeners):
+            try:
+                fn(action)
+            except Exception as e:
+                print(f"Error in safety latch listener: {e}")
+
+    def evaluate(self, sample):
+        now = time.monotonic()
+        if now - self.last_poll < self.latch_poll:
+            return
+        self.last_poll = now
+        try:
+            latched = self.latched
+        except Exception:
+            return
+        if latched is not None and self.was_latched is None:
+            threading.Thread(target=self.notify_latched, args=(latched,), daemon=True).start()
+        self.was_latched = latched
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def filter_rc(self, left_right, forward_backward, up_down, yaw):
+        return left_right, forward_backward, up_down, yaw
+
+    def status(self):
+        return self.call("safety_status")
+
+    def configure(self, rules):
+        try:
+            self.call("safety_configure", rules)
+        except RemoteError as e:
+            if e.kind == "ValueError":
+                raise ValueError(e.message)
+            raise
+
+    def reset(self):
+        self.call("safety_reset")
@@ -0,0 +1,279 @@
+import math
+import threading
+import time
+
+# Actions from least to most drastic. When several rules are breached the most
+# drastic one wins.
+ACTIONS = ("clamp", "hover", "land", "emergency")
+
+DEFAULT_RULES = {
+    # Below `below` % battery, cap rc at max_rc and don't climb
+    "battery_low": {"enabled": True, "below": 20, "action": "clamp", "max_rc": 30},
+    "battery_critical": {"enabled": True, "below": 10, "action": "land"},
+    # Height in cm, climbing is blocked at or above the ceiling
+    "altitude": {"enabled": True, "above": 300, "action": "clamp"},
+    # Average of the lowest and highest motor temperature in C
+    "temperature": {"enabled": True, "above": 90, "action": "land"},
+    # No new state packet for this many seconds
+    "stale_link": {"enabled": True, "after": 0.5, "action": "hover"},
+    # Roll or pitch in degrees
+    "tilt": {"enabled": True, "above": 45, "action": "hover"},
+    # Distance in cm from the mission pad, only checked while a pad is seen
+    "geofence": {"enabled": False, "radius": 300, "action": "land"},
+}
+
+
+def _check_battery_low(rule, sample):
+    return sample["battery"] < rule["below"]
+
+
+def _check_battery_critical(rule, sample):
+    return sample["battery"] < rule["below"]
+
+
+def _check_altitude(rule, sample):
+    # The sample's height is negated for the dashboard
+    return -sample["height"] >= rule["above"]
+
+
+def _check_temperature(rule, sample):
+    return sample["temperature"] >= rule["above"]
+
+
+def _check_stale_link(rule, sample):
+    return sample["age"] > rule["after"]
+
+
+def _check_tilt(rule, sample):
+    return abs(sample["roll"]) > rule["above"] or abs(sample["pitch"]) > rule["above"]
+
+
+def _check_geofence(rule, sample):
+    pad, x, y = sample["mission_pad"]
+    return pad >= 0 and math.hypot(x, y) > rule["radius"]
+
+
+CHECKS = {
+    "battery_low": _check_battery_low,
+    "battery_critical": _check_battery_critical,
+    "altitude": _check_altitude,
+    "temperature": _check_temperature,
+    "stale_link": _check_stale_link,
+    "tilt": _check_tilt,
+    "geofence": _check_geofence,
+}
+
+
+def _check_setting(name, key, value):
+    if key == "action":
+        if value not in ACTIONS:
+            raise ValueError(f"{name}: action must be one of {', '.join(ACTIONS)}")
+    elif key == "enabled":
+        if not isinstance(value, bool):
+            raise ValueError(f"{name}: enabled must be true or false")
+    elif key == "max_rc":
+        if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 100:
+            raise ValueError(f"{name}: max_rc must be an integer from 0 to 100")
+    elif isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 < value < math.inf:
+        raise ValueError(f"{name}: {key} must be a positive number")
+
+
+class SafetyMonitor:
+    """
+    Checks every telemetry sample against the rules and steps in when one is
+    breached: clamping rc setpoints, holding a hover, landing or cutting the
+    motors. Land and emergency latch until reset().
+
+    Every rc setpoint should go through filter_rc(), which also remembers it.
+    When a clamp rule trips, the last setpoint is sent again with the new limits
+    applied, so a drone already climbing stops at the ceiling without waiting
+    for the next stick input.
+
+    Anything else flying the drone on its own (missions, follow mode) should
+    register with add_latch_listener() so it's stopped when the monitor latches.
+
+    evaluate() is called from the TelemetryHub listener for each sample. A
+    watchdog thread re-checks the newest sample in between, so a hub that has
+    stopped producing samples still trips the stale_link rule.
+
+    Response time is measured from the breach to the command being sent. That's
+    when the sample showing it was taken, or for stale_link, when the last state
+    packet became too old.
+    """
+
+    def __init__(self, get_tello, rules=None, tick_budget=0.001, watchdog_interval=0.05):
+        self.get_tello = get_tello
+        self.rules = {name: dict(rule) for name, rule in DEFAULT_RULES.items()}
+        if rules:
+            self.configure(rules)
+        self.tick_budget = tick_budget
+        self.watchdog_interval = watchdog_interval
+        self.lock = threading.Lock()
+        self.active = {}
+        self.latched = None
+        self.setpoint = (0, 0, 0, 0)
+        self.latch_listeners = []
+        self.last_sample = None
+        self.ticks = 0
+        self.tick_max = 0.0
+        self.tick_total = 0.0
+        self.tick_overruns = 0
+        self.responses = []
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def configure(self, rules):
+        """
+        Update rule settings, e.g. {"altitude": {"above": 200}}. Raises
+        ValueError on bad input, in which case none of the settings are applied.
+        """
+        if not isinstance(rules, dict):
+            raise ValueError("Safety rules must be an object")
+        updated = {name: dict(rule) for name, rule in self.rules.items()}
+        for name, settings in rules.items():
+            if name not in updated:
+                raise ValueError(f"Unknown safety rule {name}")
+            if not isinstance(settings, dict):
+                raise ValueError(f"{name}: settings must be an object")
+            for key, value in settings.items():
+                if key not in updated[name]:
+                    raise ValueError(f"{name}: unknown setting {key}")
+                _check_setting(name, key, value)
+                updated[name][key] = value
+        # Swapped in whole so evaluate() never sees a half-applied update
+        self.rules = updated
+
+    def add_latch_listener(self, fn):
+        """fn(action) is called on its own thread when land or emergency latches."""
+        self.latch_listeners.append(fn)
+
+    def notify_latched(self, action):
+        for fn in list(self.latch_listeners):
+            try:
+                fn(action)
+            except Exception as e:
+                print(f"Error in safety latch listener: {e}")
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.watchdog, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def watchdog(self):
+        while not self.stop_event.wait(self.watchdog_interval):
+            sample = self.last_sample
+            if sample is None:
+                continue
+            # Age the newest sample to now, in case no newer one is coming
+            now = time.monotonic()
+            aged = dict(sample, monotonic=now, age=sample["age"] + now - sample["monotonic"])
+            try:
+                self.evaluate(aged, from_watchdog=True)
+            except Exception as e:
+                # Keep watching, a monitor that has died is worse than one bad tick
+                print(f"Error in safety watchdog: {e}")
+
+    def evaluate(self, sample, from_watchdog=False):
+        start = time.perf_counter()
+        if not from_watchdog:
+            self.last_sample = sample
+        breached = {}
+        for name, rule in self.rules.items():
+            if rule["enabled"] and CHECKS[name](rule, sample):
+                breached[name] = rule["action"]
+
+        with self.lock:
+            newly = [name for name in breached if name not in self.active]
+            self.active = breached
+            action = max(breached.values(), key=ACTIONS.index) if breached else None
+            command = None
+            if action in ("land", "emergency") and self.latched is None:
+                self.latched = action
+                command = action
+            elif action == "hover" and newly:
+                command = "hover"
+            elif action == "clamp" and newly:
+                command = "clamp"
+
+        elapsed = time.perf_counter() - start
+        self.ticks += 1
+        self.tick_total += elapsed
+        self.tick_max = max(self.tick_max, elapsed)
+        if elapsed > self.tick_budget:
+            self.tick_overruns += 1
+
+        if command is not None:
+            self.act(command, newly or list(breached), sample)
+            if command in ("land", "emergency"):
+                threading.Thread(target=self.notify_latched, args=(command,), daemon=True).start()
+
+    def act(self, command, rules, sample):
+        tello = self.get_tello()
+        if tello is None:
+            return
+        try:
+            if command == "emergency":
+                tello.emergency()
+            elif command == "land":
+                # Stop any rc input first so the drone isn't still moving when it lands
+                tello.send_rc_control(0, 0, 0, 0)
+                threading.Thread(target=tello.land, daemon=True).start()
+            elif command == "clamp":
+                tello.send_rc_control(*self.filter_rc(*self.setpoint))
+            else:
+                tello.send_rc_control(0, 0, 0, 0)
+        except Exception as e:
+            print(f"Error applying safety action {command}: {e}")
+        breach = min(self.breach_time(name, sample) for name in rules)
+        response = time.monotonic() - breach
+        self.responses.append({"action": command, "rules": rules, "response_ms": round(response * 1000, 3), "t": sample["t"]})
+        del self.responses[:-100]
+        print(f"Safety: {', '.join(rules)} -> {command} ({response * 1000:.1f} ms)")
+
+    def breach_time(self, name, sample):
+        if name == "stale_link":
+            return sample["monotonic"] - sample["age"] + self.rules[name]["after"]
+        return sample["monotonic"]
+
+    def filter_rc(self, left_right, forward_backward, up_down, yaw):
+        """Apply the active rules to an rc setpoint before it's sent."""
+        with self.lock:
+            self.setpoint = (left_right, forward_backward, up_down, yaw)
+            active = dict(self.active)
+            latched = self.latched
+        if latched is not None or any(a in ("hover", "land", "emergency") for a in active.values()):
+            return 0, 0, 0, 0
+        limit = 100
+        if "battery_low" in active:
+            limit = min(limit, self.rules["battery_low"]["max_rc"])
+            up_down = min(up_down, 0)
+        if "altitude" in active:
+            up_down = min(up_down, 0)
+
+        def clamp(value):
+            return int(max(-limit, min(limit, value)))
+
+        return clamp(left_right), clamp(forward_backward), clamp(up_down), clamp(yaw)
+
+    def reset(self):
+        with self.lock:
+            self.latched = None
+            self.active = {}
+
+    def status(self):
+        responses = [r["response_ms"] for r in self.responses]
+        return {
+            "active": self.active,
+            "latched": self.latched,
+            "rules": self.rules,
+            "ticks": self.ticks,
+            "tick_mean_us": round(self.tick_total / self.ticks * 1e6, 2) if self.ticks else 0.0,
+            "tick_max_us": round(self.tick_max * 1e6, 2),
+            "tick_budget_us": self.tick_budget * 1e6,
+            "tick_overruns": self.tick_overruns,
+            "response_max_ms": max(responses) if responses else None,
+            "responses": self.responses[-20:],
+        }
@@ -0,0 +1,243 @@
+"""
+Shared memory rings that let one ingest process publish the drone's frames and
+state to any number of backend worker processes.
+
+Each ring is a header (the newest sequence number plus the layout) followed by
+`slots` entries, each tagged with the sequence number written into it. The
+writer marks a slot -1 while it's filling it. Readers copy the newest entry out
+and then check its tag again, retrying if the slot was reused while they were
+copying. A slot is reused after `slots` frames (about 270 ms for 8 at 30 fps),
+too soon to hand views of it to a detector.
+"""
+
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# Default block names, shared by ingest.py and the workers
+FRAME_RING = "tello_frames"
+STATE_RING = "tello_state"
+
+# The djitellopy state packet, in ring order
+STATE_KEYS = (
+    "mid", "x", "y", "z", "pitch", "roll", "yaw", "vgx", "vgy", "vgz",
+    "templ", "temph", "tof", "h", "bat", "baro", "time", "agx", "agy", "agz",
+)
+# Fields that djitellopy parses as floats, the rest are ints
+FLOAT_KEYS = {"baro", "agx", "agy", "agz"}
+
+HEADER = np.dtype([("seq", "<i8"), ("height", "<i8"), ("width", "<i8"), ("channels", "<i8"), ("slots", "<i8")])
+FRAME_META = np.dtype([("seq", "<i8"), ("t", "<f8")])
+STATE_SLOT = np.dtype([("seq", "<i8"), ("t", "<f8")] + [(key, "<f8") for key in STATE_KEYS])
+
+
+def attach(name):
+    """
+    Open an existing block without this process owning it. Before Python 3.13
+    attaching also registers the block with the resource tracker, which would
+    unlink it when a worker exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+
+def wait_for_block(name, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return attach(name)
+        except FileNotFoundError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Shared memory {name} wasn't created within {timeout}s")
+            time.sleep(0.05)
+
+
+class FrameRing:
+    """Video frames, all the same shape. Create with create(), open with open()."""
+
+    def __init__(self, block, owner):
+        self.block = block
+        self.owner = owner
+        self.header = np.ndarray((), HEADER, block.buf, 0)
+        shape = (int(self.header["height"]), int(self.header["width"]), int(self.header["channels"]))
+        self.slots = int(self.header["slots"])
+        self.meta = np.ndarray((self.slots,), FRAME_META, block.buf, HEADER.itemsize)
+        offset = HEADER.itemsize + FRAME_META.itemsize * self.slots
+        self.frames = np.ndarray((self.slots,) + shape, np.uint8, block.buf, offset)
+        if not owner:
+            self.frames.flags.writeable = False
+
+    @classmethod
+    def create(cls, name, shape, slots=8):
+        size = HEADER.itemsize + FRAME_META.itemsize * slots + int(np.prod(shape)) * slots
+        block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((), HEADER, block.buf, 0)
+        header["height"], header["width"], header["channels"] = shape
+        header["slots"] = slots
+        header["seq"] = 0
+        del header
+        return cls(block, owner=True)
+
+    @classmethod
+    def open(cls, name, timeout=10.0):
+        return cls(wait_for_block(name, timeout), owner=False)
+
+    def write(self, frame, timestamp):
+        seq = int(self.header["seq"]) + 1
+        slot = seq % self.slots
+        self.meta[slot]["seq"] = -1
+        self.frames[slot] = frame
+        self.meta[slot]["t"] = timestamp
+        self.meta[slot]["seq"] = seq
+        self.header["seq"] = seq
+        return seq
+
+    @property
+    def seq(self):
+        return int(self.header["seq"])
+
+    def latest(self):
+        """Returns (seq, copy of the frame, timestamp), or (0, None, None) before the first frame."""
+        while True:
+            seq = int(self.header["seq"])
+            if seq == 0:
+                return 0, None, None
+            slot = seq % self.slots
+            if self.meta[slot]["seq"] != seq:
+                continue
+            timestamp = float(self.meta[slot]["t"])
+            frame = self.frames[slot].copy()
+            if self.is_current(seq):
+                return seq, frame, timestamp
+
+    def is_current(self, seq):
+        """Whether the slot for seq still holds that frame, i.e. it wasn't overwritten during a read."""
+        return self.meta[seq % self.slots]["seq"] == seq
+
+    def close(self):
+        # Views into the buffer have to go before it can be closed
+        del self.header, self.meta, self.frames
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+
+class StateRing:
+    """The drone's state packets."""
+
+    def __init__(self, block, owner, slots):
+        self.block = block
+        self.owner = owner
+        self.header = np.ndarray((), HEADER, block.buf, 0)
+        self.slots = slots
+        self.entries = np.ndarray((slots,), STATE_SLOT, block.buf, HEADER.itemsize)
+
+    @classmethod
+    def create(cls, name, slots=16):
+        block = shared_memory.SharedMemory(name=name, create=True, size=HEADER.itemsize + STATE_SLOT.itemsize * slots)
+        ring = cls(block, owner=True, slots=slots)
+        ring.header["slots"] = slots
+        ring.header["seq"] = 0
+        return ring
+
+    @classmethod
+    def open(cls, name, timeout=10.0):
+        block = wait_for_block(name, timeout)
+        slots = int(np.ndarray((), HEADER, block.buf, 0)["slots"])
+        return cls(block, owner=False, slots=slots)
+
+    def write(self, state, timestamp):
+        seq = int(self.header["seq"]) + 1
+        entry = self.entries[seq % self.slots]
+        entry["seq"] = -1
+        entry["t"] = timestamp
+        for key in STATE_KEYS:
+            entry[key] = state.get(key, 0)
+        entry["seq"] = seq
+        self.header["seq"] = seq
+        return seq
+
+    @property
+    def seq(self):
+        return int(self.header["seq"])
+
+    def latest(self):
+        """Returns (seq, state dict with djitellopy's keys and types), or (0, None)."""
+        while True:
+            seq = int(self.header["seq"])
+            if seq == 0:
+                return 0, None
+            entry = self.entries[seq % self.slots].copy()
+            if entry["seq"] == seq:
+                state = {key: float(entry[key]) if key in FLOAT_KEYS else int(entry[key]) for key in STATE_KEYS}
+                return seq, state
+
+    def close(self):
+        del self.header, self.entries
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+
+class RingFrameRead:
+    """Stand-in for djitellopy's BackgroundFrameRead that reads the newest frame from a FrameRing."""
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.stopped = False
+
+    @property
+    def frame(self):
+        frame = self.ring.latest()[1]
+        # The ring holds converted frames, flipping the channels back is just a view of the copy
+        return None if frame is None else frame[:, :, ::-1]
+
+    def stop(self):
+        self.stopped = True
+
+
+class RingFrameSource:
+    """
+    FrameSource for a backend worker: the ingest process has already converted
+    the frames, so this only copies them out of the ring. Each frame is copied
+    once and shared by every consumer, like FrameSource's one conversion.
+    """
+
+    def __init__(self, name=FRAME_RING, poll_interval=0.002):
+        self.name = name
+        self.poll_interval = poll_interval
+        self.ring = None
+        self.lock = threading.Lock()
+        self.last = (0, None, None)
+
+    def start(self, tello):
+        self.ring = FrameRing.open(self.name)
+
+    def stop(self):
+        pass
+
+    @property
+    def seq(self):
+        return 0 if self.ring is None else self.ring.seq
+
+    def latest(self):
+        if self.ring is None:
+            return 0, None, None
+        with self.lock:
+            if self.last[0] != self.ring.seq:
+                self.last = self.ring.latest()
+            return self.last
+
+    def wait_for_frame(self, after_seq, timeout=1.0):
+        deadline = time.monotonic() + timeout
+        while self.seq <= after_seq:
+            if time.monotonic() > deadline:
+                return after_seq, None, None
+            time.sleep(self.poll_interval)
+        return self.latest()
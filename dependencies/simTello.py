@@ -0,0 +1,367 @@
+import threading
+import time
+import math
+from collections import deque
+import numpy as np
+
+
+class SimFrameRead:
+    """
+    Stand-in for djitellopy's BackgroundFrameRead. Like the real decoder it hands
+    out a new array `fps` times a second, rendered from the simulated drone's yaw
+    so consumers see the picture move when it turns.
+    """
+
+    def __init__(self, drone, width=960, height=720, fps=30):
+        self.drone = drone
+        self.stopped = False
+        self.period = 1.0 / fps
+        # Horizontal gradient with a bright bar, rolled by yaw below
+        gradient = np.linspace(0, 255, width, dtype=np.uint8)
+        self.base = np.empty((height, width, 3), dtype=np.uint8)
+        self.base[:, :, 0] = gradient
+        self.base[:, :, 1] = gradient[::-1]
+        self.base[:, :, 2] = 96
+        self.base[height // 3 : 2 * height // 3, width // 2 - 20 : width // 2 + 20] = 255
+        self._frame = None
+        self._frame_time = 0.0
+
+    @property
+    def frame(self):
+        now = time.monotonic()
+        if self._frame is None or now - self._frame_time >= self.period:
+            shift = int(self.drone.get_yaw() / 360 * self.base.shape[1])
+            self._frame = np.roll(self.base, shift, axis=1)
+            self._frame_time = now
+        return self._frame
+
+    def stop(self):
+        self.stopped = True
+
+
+class TelloStateGetters:
+    """
+    The djitellopy getters, all built on get_state_field, for Tello stand-ins
+    (simulated, replayed, ...) that only need to provide get_current_state().
+    """
+
+    def get_state_field(self, key):
+        state = self.get_current_state()
+        if key not in state:
+            raise KeyError("Could not get state property: {}".format(key))
+        return state[key]
+
+    def get_mission_pad_id(self):
+        return self.get_state_field("mid")
+
+    def get_mission_pad_distance_x(self):
+        return self.get_state_field("x")
+
+    def get_mission_pad_distance_y(self):
+        return self.get_state_field("y")
+
+    def get_mission_pad_distance_z(self):
+        return self.get_state_field("z")
+
+    def get_pitch(self):
+        return self.get_state_field("pitch")
+
+    def get_roll(self):
+        return self.get_state_field("roll")
+
+    def get_yaw(self):
+        return self.get_state_field("yaw")
+
+    def get_speed_x(self):
+        return self.get_state_field("vgx")
+
+    def get_speed_y(self):
+        return self.get_state_field("vgy")
+
+    def get_speed_z(self):
+        return self.get_state_field("vgz")
+
+    def get_acceleration_x(self):
+        return self.get_state_field("agx")
+
+    def get_acceleration_y(self):
+        return self.get_state_field("agy")
+
+    def get_acceleration_z(self):
+        return self.get_state_field("agz")
+
+    def get_lowest_temperature(self):
+        return self.get_state_field("templ")
+
+    def get_highest_temperature(self):
+        return self.get_state_field("temph")
+
+    def get_temperature(self):
+        return (self.get_lowest_temperature() + self.get_highest_temperature()) / 2
+
+    def get_height(self):
+        return self.get_state_field("h")
+
+    def get_distance_tof(self):
+        return self.get_state_field("tof")
+
+    def get_barometer(self):
+        return self.get_state_field("baro")
+
+    def get_flight_time(self):
+        return self.get_state_field("time")
+
+    def get_battery(self):
+        return self.get_state_field("bat")
+
+
+class SimTello(TelloStateGetters):
+    """
+    A simulated Tello with the same interface as djitellopy.Tello (the parts
+    this project uses). Nothing is sent over the network, motion is integrated
+    from rc velocities and every command completes deterministically, so flight
+    code can be exercised and benchmarked without a drone.
+
+    `time_scale` scales how long blocking commands (move, rotate, flip, ...)
+    take: 1.0 is roughly real time, 0 makes them instant. The newest
+    `max_commands` commands sent are kept in `commands` as (time, command).
+    """
+
+    CAMERA_FORWARD = 0
+    CAMERA_DOWNWARD = 1
+
+    # cm/s at full stick, degrees/s for yaw
+    RC_SPEED = 100.0
+    RC_YAW_RATE = 100.0
+
+    def __init__(self, host="sim", time_scale=0.0, battery=100, max_commands=1000):
+        self.host = host
+        self.time_scale = time_scale
+        self.lock = threading.Lock()
+        self.is_flying = False
+        self.stream_on = False
+        self.speed = 10
+        self.video_direction = self.CAMERA_FORWARD
+        self.x = self.y = self.z = 0.0
+        self.yaw = 0.0
+        self.rc = (0, 0, 0, 0)
+        self.battery = float(battery)
+        self.takeoff_time = None
+        self.last_update = time.monotonic()
+        self.commands = deque(maxlen=max_commands)
+        self.frame_read = None
+
+    # -- internals ---------------------------------------------------------
+
+    def _advance(self):
+        now = time.monotonic()
+        dt = now - self.last_update
+        self.last_update = now
+        if not self.is_flying:
+            return
+        lr, fb, ud, yaw = self.rc
+        heading = math.radians(self.yaw)
+        vx = (fb * math.cos(heading) - lr * math.sin(heading)) / 100 * self.RC_SPEED
+        vy = (fb * math.sin(heading) + lr * math.cos(heading)) / 100 * self.RC_SPEED
+        self.x += vx * dt
+        self.y += vy * dt
+        self.z = max(0.0, self.z + ud / 100 * self.RC_SPEED * dt)
+        self.yaw = (self.yaw + yaw / 100 * self.RC_YAW_RATE * dt + 180) % 360 - 180
+        self.battery = max(0.0, self.battery - dt * 0.1)
+
+    def _command(self, command, duration=0.0):
+        with self.lock:
+            self._advance()
+            self.commands.append((time.monotonic(), command))
+        if duration and self.time_scale:
+            time.sleep(duration * self.time_scale)
+
+    # -- connection ---------------------------------------------------------
+
+    def connect(self, wait_for_state=True):
+        self._command("command")
+
+    def end(self):
+        if self.is_flying:
+            self.land()
+        self.streamoff()
+
+    def streamon(self):
+        self._command("streamon")
+        self.stream_on = True
+
+    def streamoff(self):
+        self._command("streamoff")
+        self.stream_on = False
+        if self.frame_read is not None:
+            self.frame_read.stop()
+            self.frame_read = None
+
+    def get_frame_read(self):
+        if self.frame_read is None:
+            self.frame_read = SimFrameRead(self)
+        return self.frame_read
+
+    def send_command_without_return(self, command):
+        self._command(command)
+
+    def send_control_command(self, command, timeout=7):
+        self._command(command)
+        return True
+
+    def send_keepalive(self):
+        self._command("keepalive")
+
+    def set_speed(self, x):
+        self._command("speed {}".format(x))
+        self.speed = x
+
+    def set_video_direction(self, direction):
+        self._command("downvision {}".format(direction))
+        self.video_direction = direction
+
+    def query_sdk_version(self):
+        return "sim"
+
+    # -- flight ----------------------------------------------------------------
+
+    def takeoff(self):
+        self._command("takeoff", duration=3.0)
+        with self.lock:
+            self.is_flying = True
+            self.takeoff_time = time.monotonic()
+            self.z = 80.0
+
+    def land(self):
+        self._command("land", duration=3.0)
+        with self.lock:
+            self.is_flying = False
+            self.rc = (0, 0, 0, 0)
+            self.z = 0.0
+
+    def emergency(self):
+        self._command("emergency")
+        with self.lock:
+            self.is_flying = False
+            self.rc = (0, 0, 0, 0)
+            self.z = 0.0
+
+    def reboot(self):
+        self.emergency()
+
+    def initiate_throw_takeoff(self):
+        self.takeoff()
+
+    def send_rc_control(self, left_right_velocity, forward_backward_velocity, up_down_velocity, yaw_velocity):
+        def clamp100(x):
+            return max(-100, min(100, int(x)))
+
+        with self.lock:
+            self._advance()
+            self.rc = (
+                clamp100(left_right_velocity),
+                clamp100(forward_backward_velocity),
+                clamp100(up_down_velocity),
+                clamp100(yaw_velocity),
+            )
+            self.commands.append((time.monotonic(), "rc {} {} {} {}".format(*self.rc)))
+
+    def move(self, direction, x):
+        self._command("{} {}".format(direction, x), duration=x / max(self.speed, 10))
+        with self.lock:
+            heading = math.radians(self.yaw)
+            if direction == "up":
+                self.z += x
+            elif direction == "down":
+                self.z = max(0.0, self.z - x)
+            elif direction in ("forward", "back"):
+                sign = 1 if direction == "forward" else -1
+                self.x += sign * x * math.cos(heading)
+                self.y += sign * x * math.sin(heading)
+            elif direction in ("left", "right"):
+                sign = 1 if direction == "right" else -1
+                self.x -= sign * x * math.sin(heading)
+                self.y += sign * x * math.cos(heading)
+
+    def move_up(self, x):
+        self.move("up", x)
+
+    def move_down(self, x):
+        self.move("down", x)
+
+    def move_left(self, x):
+        self.move("left", x)
+
+    def move_right(self, x):
+        self.move("right", x)
+
+    def move_forward(self, x):
+        self.move("forward", x)
+
+    def move_back(self, x):
+        self.move("back", x)
+
+    def go_xyz_speed(self, x, y, z, speed):
+        distance = math.sqrt(x**2 + y**2 + z**2)
+        self._command("go {} {} {} {}".format(x, y, z, speed), duration=distance / max(speed, 10))
+        with self.lock:
+            self.x += x
+            self.y += y
+            self.z = max(0.0, self.z + z)
+
+    def rotate_clockwise(self, x):
+        self._command("cw {}".format(x), duration=x / 90)
+        with self.lock:
+            self.yaw = (self.yaw + x + 180) % 360 - 180
+
+    def rotate_counter_clockwise(self, x):
+        self._command("ccw {}".format(x), duration=x / 90)
+        with self.lock:
+            self.yaw = (self.yaw - x + 180) % 360 - 180
+
+    def flip(self, direction):
+        self._command("flip {}".format(direction), duration=1.0)
+
+    def flip_left(self):
+        self.flip("l")
+
+    def flip_right(self):
+        self.flip("r")
+
+    def flip_forward(self):
+        self.flip("f")
+
+    def flip_back(self):
+        self.flip("b")
+
+    # -- state -------------------------------------------------------------
+
+    def get_current_state(self):
+        with self.lock:
+            self._advance()
+            lr, fb, ud, yaw = self.rc
+            flight_time = 0
+            if self.is_flying and self.takeoff_time is not None:
+                flight_time = int(time.monotonic() - self.takeoff_time)
+            return {
+                "mid": -1,
+                "x": 0,
+                "y": 0,
+                "z": 0,
+                "pitch": int(fb / 10),
+                "roll": int(lr / 10),
+                "yaw": int(round(self.yaw)),
+                "vgx": int(fb / 100 * self.RC_SPEED / 10),
+                "vgy": int(lr / 100 * self.RC_SPEED / 10),
+                "vgz": int(ud / 100 * self.RC_SPEED / 10),
+                "templ": 60,
+                "temph": 62,
+                "tof": int(self.z) + 10,
+                "h": int(self.z),
+                "bat": int(self.battery),
+                "baro": round(100.0 + self.z / 100, 2),
+                "time": flight_time,
+                "agx": 0.0,
+                "agy": 0.0,
+                "agz": -1000.0,
+            }
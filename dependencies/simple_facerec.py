@@ -12,6 +12,9 @@ class SimpleFacerec:
         # Resize frame for a faster speed
         self.frame_resizing = 0.25
 
+        # Max face distance to count as a match (face_recognition's default)
+        self.tolerance = 0.6
+
     def load_encoding_images(self, images_path):
         """
         Load encoding images from path
@@ -40,6 +43,16 @@ class SimpleFacerec:
         print("Encoding images loaded")
 
     def detect_known_faces(self, frame):
+        face_locations, face_names, _ = self.detect_known_faces_with_distances(frame)
+        return face_locations, face_names
+
+    def detect_known_faces_with_distances(self, frame):
+        """
+        Same as detect_known_faces, but also returns the distance to the closest known face
+        (None when the gallery is empty) so thresholds can be tuned offline
+        :param frame:
+        :return: face_locations, face_names, face_distances
+        """
         small_frame = cv2.resize(frame, (0, 0), fx=self.frame_resizing, fy=self.frame_resizing)
         # Find all the faces and face encodings in the current frame of video
         # Convert the image from BGR color (which OpenCV uses) to RGB color (which face_recognition uses)
@@ -48,24 +61,53 @@ class SimpleFacerec:
         face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
 
         face_names = []
+        face_distances = []
         for face_encoding in face_encodings:
-            # See if the face is a match for the known face(s)
-            matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding)
             name = "Unknown"
+            best_distance = None
 
-            # # If a match was found in known_face_encodings, just use the first one.
-            # if True in matches:
-            #     first_match_index = matches.index(True)
-            #     name = known_face_names[first_match_index]
-
-            # Or instead, use the known face with the smallest distance to the new face
-            face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
-            best_match_index = np.argmin(face_distances)
-            if matches[best_match_index]:
-                name = self.known_face_names[best_match_index]
+            # Use the known face with the smallest distance to the new face,
+            # it's a match if it's within tolerance (same test compare_faces does)
+            if len(self.known_face_encodings) > 0:
+                distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
+                best_match_index = np.argmin(distances)
+                best_distance = float(distances[best_match_index])
+                if best_distance <= self.tolerance:
+                    name = self.known_face_names[best_match_index]
             face_names.append(name)
+            face_distances.append(best_distance)
 
         # Convert to numpy array to adjust coordinates with frame resizing quickly
         face_locations = np.array(face_locations)
         face_locations = face_locations / self.frame_resizing
-        return face_locations.astype(int), face_names
+        return face_locations.astype(int), face_names, face_distances
+
+    def detect_target_face(self, frame, target):
+        """
+        Look for one known person only. Faces are encoded one at a time, largest
+        first, and compared against just that person's encodings, stopping at the
+        first match
+        :param frame:
+        :param target: name of the person (image filename without extension)
+        :return: (face_location, distance) or (None, None) if they're not in the frame
+        """
+        target_encodings = [
+            encoding for encoding, name in zip(self.known_face_encodings, self.known_face_names)
+            if name == target
+        ]
+        if not target_encodings:
+            return None, None
+
+        small_frame = cv2.resize(frame, (0, 0), fx=self.frame_resizing, fy=self.frame_resizing)
+        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        face_locations = face_recognition.face_locations(rgb_small_frame)
+        # The closest (biggest) face is the most likely to be the one we're after
+        face_locations.sort(key=lambda loc: (loc[2] - loc[0]) * (loc[1] - loc[3]), reverse=True)
+
+        for face_location in face_locations:
+            face_encoding = face_recognition.face_encodings(rgb_small_frame, [face_location])[0]
+            distance = float(np.min(face_recognition.face_distance(target_encodings, face_encoding)))
+            if distance <= self.tolerance:
+                location = (np.array(face_location) / self.frame_resizing).astype(int)
+                return location, distance
+        return None, None
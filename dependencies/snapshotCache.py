@@ -0,0 +1,61 @@
+import threading
+
+import cv2
+
+# Scale factor, or a fixed width for thumbnails
+SIZES = {
+    "full": 1.0,
+    "half": 0.5,
+    "thumb": 160,
+}
+
+
+class SnapshotCache:
+    """
+    JPEG encodes of the newest frame from a FrameSource, one per size. Each size
+    is encoded lazily, at most once per frame sequence number, however many
+    clients ask for it.
+    """
+
+    def __init__(self, frame_source, quality=95):
+        self.frame_source = frame_source
+        self.quality = quality
+        self.entries = {}
+        self.locks = {size: threading.Lock() for size in SIZES}
+        self.encodes = 0
+        self.hits = 0
+
+    def etag(self, seq, size):
+        return f'"{seq}-{size}"'
+
+    def encode(self, frame, size):
+        scale = SIZES[size]
+        if size == "thumb":
+            scale = scale / frame.shape[1]
+        if scale != 1.0:
+            frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer.tobytes()
+
+    def get(self, size="full"):
+        """Returns (seq, jpeg bytes) for the newest frame, or (0, None) before the first frame."""
+        seq, frame, _ = self.frame_source.latest()
+        if frame is None:
+            return 0, None
+        entry = self.entries.get(size)
+        if entry is not None and entry[0] == seq:
+            self.hits += 1
+            return entry
+        # One encode per size per frame, everyone else waits for it
+        with self.locks[size]:
+            entry = self.entries.get(size)
+            if entry is not None and entry[0] >= seq:
+                self.hits += 1
+                return entry
+            entry = (seq, self.encode(frame, size))
+            self.entries[size] = entry
+            self.encodes += 1
+            return entry
+
+    def stats(self):
+        return {"encodes": self.encodes, "hits": self.hits}
@@ -0,0 +1,229 @@
+"""
+Telemetry sampling and the /ws/specs wire formats.
+
+TelemetryHub polls the drone's state packet on one thread and keeps the newest
+sample, so websocket clients never call the drone themselves. Each client gets
+a TelemetrySubscription that picks the fields it wants and encodes them as JSON
+or as fixed-layout binary frames:
+
+    schema (text, sent once):  {"type": "schema", "fields": [...], "types": "...", ...}
+    frame  (binary):           <B kind><I seq><I t_ms> then the values
+        kind 1 (full):  every subscribed field, packed with the schema's types
+        kind 2 (delta): <I bitmask of changed fields> then only those values
+
+All numbers are little-endian. t_ms is milliseconds since the subscription started.
+"""
+
+import json
+import math
+import struct
+import threading
+import time
+
+# Field name -> struct type code. Order here is the order in the binary layout.
+FIELDS = {
+    "battery": "B",
+    "height": "h",
+    "temperature": "f",
+    "barometer": "f",
+    "speed_x": "h",
+    "speed_y": "h",
+    "speed_z": "h",
+    "speed_magnitude": "f",
+    "acceleration_x": "f",
+    "acceleration_y": "f",
+    "acceleration_z": "f",
+    "roll": "h",
+    "pitch": "h",
+    "yaw": "h",
+    "flight_time": "H",
+    "tof": "h",
+}
+
+FORMATS = ("json", "binary")
+
+FULL = 1
+DELTA = 2
+HEADER = struct.Struct("<BII")
+MASK = struct.Struct("<I")
+
+
+class TelemetryHub:
+    """
+    Polls tello.get_current_state() at `rate` Hz and turns it into a flat sample
+    dict. Listeners are called with every new sample on the poller thread.
+    """
+
+    def __init__(self, rate=20.0):
+        self.period = 1.0 / rate
+        self.sample = None
+        self.seq = 0
+        self.listeners = []
+        self.thread = None
+        self.stop_event = threading.Event()
+        # Speed is integrated from acceleration, like the dashboard has always shown
+        self.velocity = [0.0, 0.0, 0.0]
+        self.previous_timestamp = None
+        # djitellopy hands out a new state dict per packet, so an unchanged one means no packet
+        self.last_state = None
+        self.last_packet = None
+
+    def start(self, tello):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, args=(tello,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def make_sample(self, state, timestamp):
+        ax, ay, az = state.get("agx", 0.0), state.get("agy", 0.0), state.get("agz", 0.0)
+        if self.previous_timestamp is not None:
+            # transform three accelerations to one velocity
+            dt = timestamp - self.previous_timestamp
+            self.velocity[0] += ax * dt
+            self.velocity[1] += ay * dt
+            self.velocity[2] += az * dt
+        self.previous_timestamp = timestamp
+        return {
+            "battery": state.get("bat", 0),
+            "height": -1 * state.get("h", 0),
+            "temperature": (state.get("templ", 0) + state.get("temph", 0)) / 2,
+            "barometer": state.get("baro", 0.0),
+            "speed_x": state.get("vgx", 0),
+            "speed_y": state.get("vgy", 0),
+            "speed_z": state.get("vgz", 0),
+            # pythagorean theorem yipee
+            "speed_magnitude": math.sqrt(sum(v**2 for v in self.velocity)),
+            "acceleration_x": ax,
+            "acceleration_y": ay,
+            "acceleration_z": az,
+            "roll": state.get("roll", 0),
+            "pitch": state.get("pitch", 0),
+            "yaw": state.get("yaw", 0),
+            "flight_time": state.get("time", 0),
+            "tof": state.get("tof", 0),
+        }
+
+    def run(self, tello):
+        while not self.stop_event.wait(self.period):
+            try:
+                timestamp = time.time()
+                monotonic = time.monotonic()
+                state = tello.get_current_state()
+                if state is not self.last_state:
+                    self.last_state = state
+                    self.last_packet = monotonic
+                sample = self.make_sample(state, timestamp)
+            except Exception as e:
+                print(f"Error polling telemetry: {e}")
+                continue
+            self.seq += 1
+            sample["seq"] = self.seq
+            sample["t"] = timestamp
+            sample["monotonic"] = monotonic
+            # How old the drone's last state packet is
+            sample["age"] = monotonic - self.last_packet
+            sample["mission_pad"] = (state.get("mid", -1), state.get("x", 0), state.get("y", 0))
+            self.sample = sample
+            for listener in list(self.listeners):
+                try:
+                    listener(sample)
+                except Exception as e:
+                    print(f"Error in telemetry listener: {e}")
+
+
+def legacy_specs(sample):
+    """The nested dict /ws/specs has always sent."""
+    return {
+        "battery": sample["battery"],
+        "height": sample["height"],
+        "temperature": sample["temperature"],
+        "barometer": sample["barometer"],
+        "speed": {"x": sample["speed_x"], "y": sample["speed_y"], "z": sample["speed_z"]},
+        "speed_magnitude": sample["speed_magnitude"],  # calculated speed, id trust it
+        "acceleration": {"x": sample["acceleration_x"], "y": sample["acceleration_y"], "z": sample["acceleration_z"]},
+        "roll": sample["roll"],
+        "pitch": sample["pitch"],
+        "yaw": sample["yaw"],
+        "flight_time": sample["flight_time"],
+    }
+
+
+class TelemetrySubscription:
+    """
+    One client's choice of fields, format and delta mode. encode() returns the
+    next message to send for a sample, or None if there's nothing new.
+    """
+
+    def __init__(self, fields=None, binary=False, delta=False, keyframe_interval=5.0):
+        fields = list(fields or FIELDS)
+        unknown = [f for f in fields if f not in FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown telemetry fields: {', '.join(unknown)}")
+        if len(fields) > MASK.size * 8:
+            raise ValueError("Too many fields for one subscription")
+        # Keep the canonical order so the layout doesn't depend on how the client listed them
+        self.fields = [f for f in FIELDS if f in fields]
+        self.types = "".join(FIELDS[f] for f in self.fields)
+        self.binary = binary
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.start = time.monotonic()
+        self.last_values = None
+        self.last_keyframe = 0.0
+
+    def schema(self):
+        return json.dumps({
+            "type": "schema",
+            "format": "binary" if self.binary else "json",
+            "fields": self.fields,
+            "types": self.types,
+            "header": "<BII",
+            "delta": self.delta,
+            "kinds": {"full": FULL, "delta": DELTA},
+        })
+
+    def values(self, sample):
+        values = []
+        for field, code in zip(self.fields, self.types):
+            value = sample[field]
+            values.append(value if code == "f" else int(value))
+        return values
+
+    def encode(self, sample):
+        values = self.values(sample)
+        now = time.monotonic()
+        t_ms = int((now - self.start) * 1000) & 0xFFFFFFFF
+        seq = sample["seq"] & 0xFFFFFFFF
+
+        # Send everything on the first message and every keyframe_interval so a
+        # client that missed something can resync
+        keyframe = (
+            not self.delta
+            or self.last_values is None
+            or now - self.last_keyframe >= self.keyframe_interval
+        )
+        if keyframe:
+            self.last_values = values
+            self.last_keyframe = now
+            if self.binary:
+                return HEADER.pack(FULL, seq, t_ms) + struct.pack("<" + self.types, *values)
+            return json.dumps({"seq": seq, "t": t_ms, **dict(zip(self.fields, values))}, separators=(",", ":"))
+
+        changed = [i for i, (a, b) in enumerate(zip(values, self.last_values)) if a != b]
+        if not changed:
+            return None
+        self.last_values = values
+        if self.binary:
+            mask = 0
+            for i in changed:
+                mask |= 1 << i
+            types = "<" + "".join(self.types[i] for i in changed)
+            return HEADER.pack(DELTA, seq, t_ms) + MASK.pack(mask) + struct.pack(types, *(values[i] for i in changed))
+        return json.dumps(
+            {"seq": seq, "t": t_ms, **{self.fields[i]: values[i] for i in changed}}, separators=(",", ":")
+        )
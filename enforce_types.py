@@ -34,7 +34,10 @@ def enforce_types(target):
                 if _is_unparameterized_special_typing(type_hint):
                     continue
 
-                if (
+                if getattr(type_hint, "__origin__", None) is typing.Union:
+                    # Optional[X] and Union[X, Y]: any of the members will do
+                    actual_type = type_hint.__args__
+                elif (
                     hasattr(type_hint, "__origin__")
                     and type_hint.__origin__ is not None
                 ):
@@ -44,6 +47,10 @@ def enforce_types(target):
                 else:
                     actual_type = type_hint
 
+                # An int is fine where a float is expected, as in PEP 484
+                if actual_type is float or (isinstance(actual_type, tuple) and float in actual_type):
+                    actual_type = (int,) + (actual_type if isinstance(actual_type, tuple) else (actual_type,))
+
                 if not isinstance(value, actual_type):
                     raise TypeError(
                         "Unexpected type for '{}' (expected {} but found {})".format(
@@ -0,0 +1,103 @@
+"""
+Owns the drone connection for a multi-worker backend. Frames and state packets
+are published to shared memory rings, commands from the workers arrive over a
+local multiprocessing.connection channel, and the safety monitor runs here so
+there's one of it however many workers there are.
+
+Usually started by serveWorkers.py. To run it by hand, with the same secret
+key for both:
+
+    export TELLO_INGEST_KEY=$(python -c "import os; print(os.urandom(32).hex())")
+    python ingest.py --sim --address 127.0.0.1:8790
+    TELLO_INGEST=127.0.0.1:8790 uvicorn runBackend:app --workers 4
+"""
+
+import argparse
+import os
+import signal
+import threading
+
+from djitellopy import Tello
+
+from dependencies.framePipeline import FrameSource
+from dependencies.remoteTello import CommandServer, authkey_from_env
+from dependencies.safetyMonitor import SafetyMonitor
+from dependencies.sharedRing import FRAME_RING, STATE_RING, FrameRing, StateRing
+from dependencies.simTello import SimTello
+from dependencies.telemetry import TelemetryHub
+
+
+def publish_frames(frame_source, name, slots, stop_event):
+    ring = None
+    seq = 0
+    try:
+        while not stop_event.is_set():
+            seq, frame, timestamp = frame_source.wait_for_frame(seq)
+            if frame is None:
+                continue
+            if ring is None:
+                # The frame size is only known once the first one has been decoded
+                ring = FrameRing.create(name, frame.shape, slots)
+            ring.write(frame, timestamp)
+    finally:
+        if ring is not None:
+            ring.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drone ingest process for a multi-worker backend")
+    parser.add_argument("--address", default="127.0.0.1:8790", help="host:port for worker commands")
+    parser.add_argument("--sim", action="store_true", default=os.environ.get("TELLO_SIM", "0") == "1")
+    parser.add_argument("--frame-ring", default=FRAME_RING)
+    parser.add_argument("--state-ring", default=STATE_RING)
+    parser.add_argument("--slots", type=int, default=8, help="frames kept in the ring")
+    parser.add_argument("--state-rate", type=float, default=50.0, help="state packets per second to publish")
+    args = parser.parse_args()
+
+    authkey = authkey_from_env()
+    tello = SimTello(time_scale=1.0) if args.sim else Tello()
+    tello.connect()
+    tello.streamon()
+    print("Connected to Tello.")
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    state_ring = StateRing.create(args.state_ring)
+    hub = TelemetryHub(rate=args.state_rate)
+    safety_monitor = SafetyMonitor(lambda: tello)
+
+    def publish_state(sample):
+        # Only new packets, so workers can tell a stale link from a quiet one
+        if sample["age"] == 0:
+            state_ring.write(hub.last_state, sample["t"])
+
+    hub.add_listener(publish_state)
+    hub.add_listener(safety_monitor.evaluate)
+    hub.start(tello)
+    safety_monitor.start()
+
+    frame_source = FrameSource()
+    frame_source.start(tello)
+    frames = threading.Thread(
+        target=publish_frames, args=(frame_source, args.frame_ring, args.slots, stop_event), daemon=True
+    )
+    frames.start()
+
+    server = CommandServer(tello, safety_monitor, args.address, authkey=authkey)
+    server.start()
+    print(f"Ingest listening on {args.address}")
+
+    stop_event.wait()
+    server.stop()
+    frame_source.stop()
+    hub.stop()
+    safety_monitor.stop()
+    frames.join(timeout=2)
+    state_ring.close()
+    tello.end()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,32 @@
+"""
+Build a compact landmark vocabulary from recorded footage.
+
+Frames are streamed from a video file, a directory of images or a camera, and
+their ORB descriptors are deduplicated as they arrive: a descriptor within
+`--radius` Hamming bits of one already in the vocabulary is merged into it
+instead of being stored again. The result is written as an indexed vocabulary
+that TelloSwarm.load_known_landmarks memory-maps:
+
+    <name>.desc.npy   uint8 (N, 32) ORB descriptors
+    <name>.kp.npy     float32 (N, 7) keypoint x, y, size, angle, response, octave, frame
+    <name>.json       counts, build parameters and per-frame row ranges
+
+Usage:
+    python makeLandmarks.py flight.mp4 -o landmarks/hangar
+    python makeLandmarks.py frames/ -o landmarks/hangar --radius 40
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+
 import cv2
 import numpy as np
 
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
 
 def capture_and_save_landmarks(output_path, num_frames=10):
     orb = cv2.ORB_create()
@@ -21,5 +47,216 @@ def capture_and_save_landmarks(output_path, num_frames=10):
     np.save(output_path, combined_descriptors)
 
 
-# Example usage
-capture_and_save_landmarks("landmark_descriptors.npy")
+def iter_frames(source, every=1, max_frames=None):
+    """Yield grayscale frames from a video file, an image directory or a camera index."""
+    count = 0
+    if os.path.isdir(source):
+        paths = sorted(
+            p for p in glob.glob(os.path.join(source, "*.*")) if p.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        for index, path in enumerate(paths):
+            if index % every:
+                continue
+            frame = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if frame is not None:
+                yield frame
+                count += 1
+                if max_frames and count >= max_frames:
+                    return
+        return
+
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    index = 0
+    try:
+        while cap.grab():
+            if index % every == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                    count += 1
+                    if max_frames and count >= max_frames:
+                        return
+            index += 1
+    finally:
+        cap.release()
+
+
+class LandmarkVocabulary:
+    """
+    Streaming descriptor deduplication. Keeps one representative per cluster of
+    near-identical descriptors (the one with the strongest keypoint response)
+    along with its keypoint geometry and a count of how many it stands for.
+    """
+
+    def __init__(self, radius=32, capacity=4096):
+        self.radius = radius
+        self.descriptors = np.empty((capacity, 32), dtype=np.uint8)
+        self.keypoints = np.empty((capacity, 7), dtype=np.float32)
+        self.weights = np.zeros(capacity, dtype=np.uint32)
+        self.size = 0
+        self.seen = 0
+        self.frame_rows = []
+        self.bf = cv2.BFMatcher(cv2.NORM_HAMMING)
+
+    def _grow(self):
+        capacity = len(self.descriptors) * 2
+        self.descriptors = np.resize(self.descriptors, (capacity, 32))
+        self.keypoints = np.resize(self.keypoints, (capacity, 7))
+        weights = np.zeros(capacity, dtype=np.uint32)
+        weights[: self.size] = self.weights[: self.size]
+        self.weights = weights
+
+    def add_frame(self, keypoints, descriptors, frame_index):
+        first_row = self.size
+        if descriptors is not None and len(descriptors):
+            geometry = np.array(
+                [(k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave, frame_index) for k in keypoints],
+                dtype=np.float32,
+            )
+            self.seen += len(descriptors)
+            is_new = np.ones(len(descriptors), dtype=bool)
+            if self.size:
+                # Nearest vocabulary entry for every descriptor in one BFMatcher call
+                for match in self.bf.match(descriptors, self.descriptors[: self.size]):
+                    if match.distance > self.radius:
+                        continue
+                    is_new[match.queryIdx] = False
+                    row = match.trainIdx
+                    self.weights[row] += 1
+                    if geometry[match.queryIdx, 4] > self.keypoints[row, 4]:
+                        self.descriptors[row] = descriptors[match.queryIdx]
+                        self.keypoints[row] = geometry[match.queryIdx]
+            new = np.flatnonzero(is_new)
+            while self.size + len(new) > len(self.descriptors):
+                self._grow()
+            end = self.size + len(new)
+            self.descriptors[self.size : end] = descriptors[new]
+            self.keypoints[self.size : end] = geometry[new]
+            self.weights[self.size : end] = 1
+            self.size = end
+        self.frame_rows.append([frame_index, first_row, self.size])
+
+    def save(self, output_prefix, meta=None):
+        directory = os.path.dirname(output_prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.save(output_prefix + ".desc.npy", self.descriptors[: self.size])
+        np.save(output_prefix + ".kp.npy", self.keypoints[: self.size])
+        info = {
+            "descriptors": self.size,
+            "descriptors_seen": self.seen,
+            "removed": self.seen - self.size,
+            "radius": self.radius,
+            "weights": self.weights[: self.size].tolist(),
+            "frames": self.frame_rows,
+            "keypoint_columns": ["x", "y", "size", "angle", "response", "octave", "frame"],
+        }
+        info.update(meta or {})
+        with open(output_prefix + ".json", "w") as f:
+            json.dump(info, f)
+
+
+class DescriptorReservoir:
+    """
+    Uniform random sample of at most `capacity` raw descriptors out of however
+    many stream past, so comparing against the raw set doesn't mean keeping all
+    of it (reservoir sampling, algorithm R).
+    """
+
+    def __init__(self, capacity=200_000, seed=0):
+        self.capacity = capacity
+        self.samples = np.empty((capacity, 32), dtype=np.uint8)
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, descriptors):
+        # The i-th descriptor overall goes to slot i while there's room, then replaces
+        # a random slot with probability capacity / (i + 1)
+        indices = self.seen + np.arange(len(descriptors))
+        self.seen += len(descriptors)
+        slots = np.where(indices < self.capacity, indices, self.rng.integers(0, indices + 1))
+        keep = slots < self.capacity
+        self.samples[slots[keep]] = descriptors[keep]
+
+    @property
+    def sample(self):
+        return self.samples[: min(self.seen, self.capacity)]
+
+
+def build_landmarks(source, output_prefix, radius=32, features=500, every=1, max_frames=None, raw_sample=200_000):
+    orb = cv2.ORB_create(nfeatures=features)
+    vocabulary = LandmarkVocabulary(radius=radius)
+    raw = DescriptorReservoir(raw_sample)
+    start = time.perf_counter()
+    for frame_index, gray_frame in enumerate(iter_frames(source, every, max_frames)):
+        keypoints, descriptors = orb.detectAndCompute(gray_frame, None)
+        if descriptors is not None:
+            raw.add(descriptors)
+        vocabulary.add_frame(keypoints, descriptors, frame_index)
+    build_seconds = time.perf_counter() - start
+
+    vocabulary.save(output_prefix, {"source": source, "features": features, "every": every})
+    return vocabulary, raw, build_seconds
+
+
+def measure_speedup(raw, compact, raw_count=None, queries=500, repeats=5):
+    """
+    Time BFMatcher.match of a query set against the raw and compact descriptor
+    sets. When `raw` is a sample of raw_count descriptors, the raw time is
+    scaled up to the full set: brute-force matching is linear in its size.
+    """
+    if len(raw) == 0 or len(compact) == 0:
+        return None
+    raw_count = raw_count or len(raw)
+    rng = np.random.default_rng(0)
+    query = raw[rng.choice(len(raw), size=min(queries, len(raw)), replace=False)]
+    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+
+    def best_of(train):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            bf.match(query, train)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    raw_seconds = best_of(np.ascontiguousarray(raw)) * raw_count / len(raw)
+    compact_seconds = best_of(np.ascontiguousarray(compact))
+    return raw_seconds, compact_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a deduplicated ORB landmark vocabulary")
+    parser.add_argument("source", help="video file, directory of frames or camera index")
+    parser.add_argument("-o", "--output", default="landmarks/landmarks", help="output path prefix")
+    parser.add_argument("--radius", type=int, default=32, help="max Hamming distance (bits) to merge descriptors")
+    parser.add_argument("--features", type=int, default=500, help="ORB features per frame")
+    parser.add_argument("--every", type=int, default=1, help="only use every Nth frame")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument(
+        "--raw-sample", type=int, default=200_000, help="raw descriptors kept to time matching against"
+    )
+    args = parser.parse_args()
+
+    vocabulary, raw, build_seconds = build_landmarks(
+        args.source, args.output, args.radius, args.features, max(1, args.every), args.max_frames, args.raw_sample
+    )
+    seen = vocabulary.seen
+    removed = seen - vocabulary.size
+    print(
+        f"{len(vocabulary.frame_rows)} frames, {seen} descriptors -> {vocabulary.size} "
+        f"({removed} removed, {removed / seen:.1%}) in {build_seconds:.2f}s" if seen else "No descriptors found"
+    )
+    timing = measure_speedup(raw.sample, vocabulary.descriptors[: vocabulary.size], raw.seen)
+    if timing:
+        raw_seconds, compact_seconds = timing
+        estimated = f" (raw estimated from {len(raw.sample)} sampled)" if len(raw.sample) < raw.seen else ""
+        print(
+            f"matching: {raw_seconds * 1000:.2f} ms raw, {compact_seconds * 1000:.2f} ms compact, "
+            f"{raw_seconds / compact_seconds:.1f}x faster{estimated}"
+        )
+    print(f"Saved {args.output}.desc.npy, {args.output}.kp.npy and {args.output}.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,29 @@
-import math
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse, FileResponse
+import time
+
+# Measured from here so /ready can say how long startup took
+STARTED_AT = time.monotonic()
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import StreamingResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from dependencies.faceRecognition import FacialRecognition
+from dependencies.lazySubsystem import Subsystem
+from dependencies.faceFollow import FaceFollower
+from dependencies.framePipeline import FrameSource, DetectionWorker
+from dependencies.motionGate import MotionGate
+from dependencies.snapshotCache import SnapshotCache, SIZES
+from dependencies.telemetry import TelemetryHub, TelemetrySubscription, legacy_specs, FORMATS
+from dependencies.safetyMonitor import SafetyMonitor
+from dependencies.droneRegistry import DroneRegistry
+from dependencies.remoteTello import RemoteTello, RemoteSafetyMonitor
+from dependencies.sharedRing import RingFrameSource
+from dependencies.loopWatchdog import LoopWatchdog, HandlerTimings, HandlerTimingMiddleware
+from dependencies.missionPlan import MissionRunner, MissionError
+from dependencies.simTello import SimTello
+from dependencies.flightRecorder import FlightRecorder, RecordingTello, ReplayTello
 from djitellopy import Tello
 import threading
-import time
+import queue
 import cv2
 import os
 import json
@@ -14,10 +31,37 @@ import asyncio
 
 app = FastAPI()
 
-faceRecognition = FacialRecognition("faces")
 
-velocity_x, velocity_y, velocity_z = 0.0, 0.0, 0.0
-previous_timestamp = None
+def load_face_recognition():
+    # face_recognition pulls in dlib, so it's imported only when it's needed
+    from dependencies.faceRecognition import FacialRecognition
+
+    return FacialRecognition("faces")
+
+
+def load_haar_cascade():
+    return cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+
+faceRecognition = Subsystem("face_recognition", load_face_recognition)
+haarCascade = Subsystem("haar_cascade", load_haar_cascade)
+subsystems = [faceRecognition, haarCascade]
+
+# Set LAZY_SUBSYSTEMS=1 to load them only when first used instead of warming at startup
+LAZY_SUBSYSTEMS = os.environ.get("LAZY_SUBSYSTEMS", "0") == "1"
+
+# Set TELLO_INGEST to the host:port of a running ingest.py to share its drone
+# between worker processes (see serveWorkers.py)
+INGEST_ADDRESS = os.environ.get("TELLO_INGEST")
+
+telemetry_hub = TelemetryHub()
+# Checks every telemetry sample and overrides rc input or lands when a rule is breached.
+# With an ingest process that happens there, once for every worker
+if INGEST_ADDRESS:
+    safety_monitor = RemoteSafetyMonitor(lambda: tello)
+else:
+    safety_monitor = SafetyMonitor(lambda: tello)
+telemetry_hub.add_listener(safety_monitor.evaluate)
 
 # Add CORS middleware
 app.add_middleware(
@@ -28,7 +72,15 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Event loop lag in seconds that counts as blocked, LOOP_LAG_THRESHOLD=0.05 for 50 ms
+loop_watchdog = LoopWatchdog(threshold=float(os.environ.get("LOOP_LAG_THRESHOLD", "0.1")))
+handler_timings = HandlerTimings()
+app.add_middleware(HandlerTimingMiddleware, timings=handler_timings)
+
 faceProccessing = 0
+# Person to look for with /faceRecognition, None to name everyone in the gallery
+recognition_target = None
+face_follower = None
 
 # Initialize velocity state
 velocity_state = {
@@ -40,25 +92,106 @@ velocity_state = {
 
 tello = None
 tello_ready_event = threading.Event()
+tello_error = None
+first_frame_at = None
 
 clients = []
 
+# Set TELLO_SIM=1 to fly the simulated drone instead of a real one
+USE_SIM = os.environ.get("TELLO_SIM", "0") == "1"
+# Set TELLO_REPLAY to a recording directory to play it back instead of a drone
+REPLAY_PATH = os.environ.get("TELLO_REPLAY")
+REPLAY_SPEED = float(os.environ.get("TELLO_REPLAY_SPEED", "1.0"))
+# Set TELLO_RECORD to a directory to record every flight from startup
+RECORD_PATH = os.environ.get("TELLO_RECORD")
+# Recordings started through /record/start always go under here
+RECORDINGS_DIR = "recordings"
+
+recorder = None
+
+mission_runner = None
+# Held from checking for a running mission to starting the new one
+mission_lock = threading.Lock()
+mission_subscribers = []
+
 def initialize_tello():
-    global tello
-    tello = Tello()
+    global tello, tello_error
+    if INGEST_ADDRESS:
+        tello = RemoteTello(INGEST_ADDRESS)
+    elif REPLAY_PATH:
+        tello = ReplayTello(REPLAY_PATH, speed=REPLAY_SPEED, loop=True)
+    elif USE_SIM:
+        tello = SimTello(time_scale=1.0)
+    else:
+        tello = Tello()
     try:
         tello.connect()
         tello.streamon()
         print("Connected to Tello.")
+        frame_source.start(tello)
+        detection_worker.start()
+        telemetry_hub.start(tello)
+        safety_monitor.start()
+        if RECORD_PATH:
+            start_recording(RECORD_PATH)
         tello_ready_event.set()
     except Exception as e:
         print(f"Error initializing Tello: {e}")
+        tello_error = str(e)
         tello = None
 
 
 @app.on_event("startup")
 def on_startup():
     threading.Thread(target=initialize_tello).start()
+    if not LAZY_SUBSYSTEMS:
+        for subsystem in subsystems:
+            subsystem.warm()
+
+
+@app.on_event("startup")
+async def start_loop_watchdog():
+    endpoints = {route.endpoint.__code__: route.path for route in app.routes if hasattr(route, "endpoint")}
+    loop_watchdog.start(endpoints)
+
+
+@app.get("/diagnostics")
+def diagnostics():
+    return {"loop": loop_watchdog.stats(), "handlers": handler_timings.stats()}
+
+
+@app.get("/ready")
+def ready():
+    if tello_ready_event.is_set():
+        tello_state = "ready"
+    elif tello_error is not None:
+        tello_state = "failed"
+    else:
+        tello_state = "loading"
+    return {
+        "ready": tello_ready_event.is_set(),
+        "uptime": round(time.monotonic() - STARTED_AT, 3),
+        "first_frame_after": None if first_frame_at is None else round(first_frame_at - STARTED_AT, 3),
+        "subsystems": {
+            "tello": {"state": tello_state, "error": tello_error},
+            **{subsystem.name: subsystem.status() for subsystem in subsystems},
+        },
+    }
+
+
+def require_unlatched(monitor=None):
+    """Refuse flight commands while a safety land or emergency is latched."""
+    latched = (monitor or safety_monitor).latched
+    if latched is not None:
+        raise HTTPException(status_code=409, detail=f"Safety interlock latched ({latched}), reset it first")
+
+
+def require_subsystem(subsystem):
+    """Load a lazy subsystem now, answering 503 with its error if it can't be loaded."""
+    try:
+        return subsystem.get()
+    except Exception:
+        raise HTTPException(status_code=503, detail=f"{subsystem.name} failed to load: {subsystem.error}")
 
 
 def run_in_thread(target, *args, **kwargs):
@@ -67,47 +200,121 @@ def run_in_thread(target, *args, **kwargs):
     return thread
 
 
-def get_video_stream():
+def detect_recognition(frame):
+    if face_follower is not None and face_follower.is_running():
+        # The follow loop is already looking for the target, report what it found
+        location = face_follower.last_location
+        found = location is not None
+        face_locations = [location] if found else []
+        face_names = [face_follower.target] if found else []
+        distances = [face_follower.last_distance] if found else []
+    elif recognition_target:
+        location, distance = faceRecognition.get().detect_target(frame, recognition_target)
+        found = location is not None
+        face_locations = [location] if found else []
+        face_names = [recognition_target] if found else []
+        distances = [distance] if found else []
+    else:
+        face_locations, face_names, distances = faceRecognition.get().sfr.detect_known_faces_with_distances(frame)
+    boxes = [(x1, y1, x2, y2) for y1, x2, y2, x1 in face_locations]
+    return boxes, face_names, distances
+
+
+def detect_haar(frame):
+    # Convert the image to grayscale
+    gray_image = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    # Look for faces in the image using the loaded cascade file
+    faces = haarCascade.get().detectMultiScale(gray_image, 1.1, 5)
+    boxes = [(x, y, x + w, y + h) for x, y, w, h in faces]
+    return boxes, [""] * len(boxes), [None] * len(boxes)
+
+
+def current_detector():
+    """The detector the DetectionWorker should run right now, or None."""
+    # Keep streaming plain frames while a model is still loading. A model that failed
+    # stays off until /faceRecognition or /faceDetection asks again
+    if faceProccessing == 1:
+        if not faceRecognition.is_ready():
+            faceRecognition.warm()
+            return None
+        if face_follower is not None and face_follower.is_running():
+            return "follow", detect_recognition
+        if recognition_target:
+            # Named per target, so a result for one person is never reused for another
+            return f"face_target:{recognition_target}", detect_recognition
+        return "face_recognition", detect_recognition
+    if faceProccessing == -1:
+        if not haarCascade.is_ready():
+            haarCascade.warm()
+            return None
+        return "haar", detect_haar
+    return None
+
+
+# Workers behind an ingest process serve frames straight out of its shared memory ring
+frame_source = RingFrameSource() if INGEST_ADDRESS else FrameSource()
+# Skip inference on frames that barely differ from the last one it ran on and reuse
+# that result. MOTION_THRESHOLD is the fraction of a small grayscale thumbnail that
+# has to change to count, MOTION_MAX_AGE the most seconds a result is reused for.
+# MOTION_GATE=0 runs every frame.
+motion_gate = None
+if os.environ.get("MOTION_GATE", "1") == "1":
+    motion_gate = MotionGate(
+        threshold=float(os.environ.get("MOTION_THRESHOLD", "0.01")),
+        max_age=float(os.environ.get("MOTION_MAX_AGE", "1.0")),
+    )
+# Follow mode only reports what the follow loop already found, so it's never gated
+detection_worker = DetectionWorker(frame_source, current_detector, gate=motion_gate, ungated=("follow",))
+snapshot_cache = SnapshotCache(frame_source)
+
+# Results older than this aren't drawn onto the stream
+DETECTION_MAX_AGE = 0.5
+
+
+def draw_detection(frame, detection):
+    if detection["detector"] == "haar":
+        # Draw a rectangle around the faces
+        for x1, y1, x2, y2 in detection["boxes"]:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        return
+    for (x1, y1, x2, y2), name in zip(detection["boxes"], detection["names"]):
+        cv2.putText(
+            frame,
+            name,
+            (x1, y1 - 10),
+            cv2.FONT_HERSHEY_DUPLEX,
+            1,
+            (0, 0, 200),
+            2,
+        )
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 200), 4)
+
+
+def get_video_stream(overlay=True):
+    global first_frame_at
     if not tello_ready_event.is_set():
         raise HTTPException(status_code=500, detail="Tello not initialized")
 
-    frame_read = tello.get_frame_read()
+    seq = 0
     while True:
         try:
-            frame = frame_read.frame
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            if faceProccessing == 1:
-                face_locations, face_names = faceRecognition.detect_face(frame_rgb)
-                for face_loc, name in zip(face_locations, face_names):
-                    y1, x2, y2, x1 = face_loc[0], face_loc[1], face_loc[2], face_loc[3]
-                    cv2.putText(
-                        frame_rgb,
-                        name,
-                        (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_DUPLEX,
-                        1,
-                        (0, 0, 200),
-                        2,
-                    )
-                    cv2.rectangle(frame_rgb, (x1, y1), (x2, y2), (0, 0, 200), 4)
-            elif faceProccessing == -1:
-                face_cascade = cv2.CascadeClassifier(
-                    cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-                )
-
-                # Convert the image to grayscale
-                gray_image = cv2.cvtColor(frame_rgb, cv2.COLOR_BGR2GRAY)
-
-                # Look for faces in the image using the loaded cascade file
-                faces = face_cascade.detectMultiScale(gray_image, 1.1, 5)
-
-                # Draw a rectangle around the faces
-                for x, y, w, h in faces:
-                    cv2.rectangle(frame_rgb, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-            _, buffer = cv2.imencode(".jpg", frame_rgb)
-            frame = buffer.tobytes()
+            seq, frame, _ = frame_source.wait_for_frame(seq)
+            if frame is None:
+                continue
+
+            detection = detection_worker.result
+            if overlay and detection is not None and time.time() - detection["t"] < DETECTION_MAX_AGE:
+                # The frame is shared with every other viewer, so draw on a copy
+                frame = frame.copy()
+                draw_detection(frame, detection)
+                _, buffer = cv2.imencode(".jpg", frame)
+                frame = buffer.tobytes()
+            else:
+                # Clean frames are encoded once and shared by every viewer
+                seq, frame = snapshot_cache.get("full")
+            if first_frame_at is None:
+                first_frame_at = time.monotonic()
             yield (b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + frame + b"\r\n")
             time.sleep(1 / 35)
         except Exception as e:
@@ -116,21 +323,67 @@ def get_video_stream():
 
 
 @app.get("/video_feed")
-def video_feed():
+def video_feed(overlay: bool = True):
     run_in_thread(tello.set_video_direction, tello.CAMERA_FORWARD)
     return StreamingResponse(
-        get_video_stream(), media_type="multipart/x-mixed-replace; boundary=frame"
+        get_video_stream(overlay), media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
 
 @app.get("/video_feed_down")
-def video_feed_down():
+def video_feed_down(overlay: bool = True):
     run_in_thread(tello.set_video_direction, tello.CAMERA_DOWNWARD)
     return StreamingResponse(
-        get_video_stream(), media_type="multipart/x-mixed-replace; boundary=frame"
+        get_video_stream(overlay), media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
 
+@app.get("/snapshot")
+def snapshot(request: Request, size: str = "full"):
+    if not tello_ready_event.is_set():
+        raise HTTPException(status_code=500, detail="Tello not initialized")
+    if size not in SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {', '.join(SIZES)}")
+    # Pollers that already have the newest frame get a 304 without anything being encoded
+    seq = frame_source.seq
+    if seq and request.headers.get("if-none-match") == snapshot_cache.etag(seq, size):
+        return Response(status_code=304, headers={"ETag": snapshot_cache.etag(seq, size), "Cache-Control": "no-cache"})
+    seq, jpeg = snapshot_cache.get(size)
+    if jpeg is None:
+        raise HTTPException(status_code=503, detail="No frame yet")
+    headers = {"ETag": snapshot_cache.etag(seq, size), "Cache-Control": "no-cache"}
+    return Response(content=jpeg, media_type="image/jpeg", headers=headers)
+
+
+@app.get("/detections/stats")
+def detection_stats():
+    """How many frames ran inference vs reused a result, and the inference time that saved."""
+    return detection_worker.stats()
+
+
+@app.websocket("/ws/detections")
+async def detections_websocket(websocket: WebSocket, max_rate: float = 30.0):
+    """
+    Streams detection results for clients that draw their own overlay (use
+    /video_feed?overlay=false for clean frames). Each message is tagged with the
+    sequence number of the frame it was computed on. max_rate caps messages/second
+    (0.1 to 60).
+    """
+    await websocket.accept()
+    period = 1 / max(0.1, min(max_rate, 60.0))
+    last = None
+    try:
+        while True:
+            detection = detection_worker.result
+            if detection is not last:
+                last = detection
+                message = detection if detection is not None else {"seq": frame_source.seq, "detector": None}
+                await websocket.send_text(json.dumps(message, separators=(",", ":")))
+            await asyncio.sleep(period)
+    except WebSocketDisconnect:
+        pass
+
+
 @app.get("/connect")
 def connect():
     if not tello_ready_event.is_set():
@@ -151,6 +404,7 @@ def battery():
 def takeoff():
     if not tello_ready_event.is_set():
         raise HTTPException(status_code=500, detail="Tello not initialized")
+    require_unlatched()
 
     def takeoff_with_logging():
         try:
@@ -209,12 +463,14 @@ async def handle_movement(data: dict):
     velocity_state["up_down_velocity"] = data.get("up_down_velocity", 0) * speed
     velocity_state["yaw_velocity"] = data.get("yaw_velocity", 0) * speed
 
-    # Send the rc control command with the updated velocities
+    # Send the rc control command with the updated velocities, limited by any active safety rules
     tello.send_rc_control(
-        velocity_state["left_right_velocity"],
-        velocity_state["forward_backward_velocity"],
-        velocity_state["up_down_velocity"],
-        velocity_state["yaw_velocity"],
+        *safety_monitor.filter_rc(
+            velocity_state["left_right_velocity"],
+            velocity_state["forward_backward_velocity"],
+            velocity_state["up_down_velocity"],
+            velocity_state["yaw_velocity"],
+        )
     )
 
     # Stop the drone if all velocities are zero
@@ -227,57 +483,57 @@ async def handle_movement(data: dict):
 
 
 @app.websocket("/ws/specs")
-async def specs_websocket(websocket: WebSocket):
-    global velocity_x, velocity_y, velocity_z, previous_timestamp
+async def specs_websocket(
+    websocket: WebSocket,
+    fields: str = None,
+    rate: float = 20.0,
+    format: str = "json",
+    delta: bool = False,
+):
+    """
+    With no query parameters this sends the full nested JSON it always has.
+    Otherwise the client picks comma separated `fields`, a `rate` in Hz,
+    `format` json or binary, and `delta` to only send fields that changed.
+    A schema message describing the layout is sent first (see dependencies/telemetry.py).
+    """
+    await stream_specs(websocket, telemetry_hub, tello_ready_event, fields, rate, format, delta)
+
+
+async def stream_specs(websocket, hub, ready_event, fields, rate, format, delta):
     await websocket.accept()
+    legacy = fields is None and format == "json" and not delta
+    subscription = None
+    if not legacy:
+        try:
+            if format not in FORMATS:
+                raise ValueError(f"Unknown telemetry format: {format}")
+            subscription = TelemetrySubscription(
+                fields.split(",") if fields else None, binary=format == "binary", delta=delta
+            )
+        except ValueError as e:
+            await websocket.send_text(json.dumps({"type": "error", "error": str(e)}))
+            await websocket.close()
+            return
+        await websocket.send_text(subscription.schema())
+
+    period = 1 / max(0.1, min(rate, 50.0))
+    last_seq = None
     try:
-        while True:
-            if tello_ready_event.is_set():
-                timestamp = time.time()
-                if previous_timestamp is not None:
-                    # transform three accelerations to one velocity
-                    dt = timestamp - previous_timestamp
-                    # accels
-                    ax = tello.get_acceleration_x()
-                    ay = tello.get_acceleration_y()
-                    az = tello.get_acceleration_z()
-                    # update velocity
-                    velocity_x += ax * dt
-                    velocity_y += ay * dt
-                    velocity_z += az * dt
-                
-                previous_timestamp = timestamp
-                #pythagorean theorem yipee
-                speed = math.sqrt(velocity_x**2 + velocity_y**2 + velocity_z**2)
-
-                battery = tello.get_battery()
-                height = -1 * tello.get_height()
-                temperature = tello.get_temperature()
-                barometer = tello.get_barometer()
-                speed_x = tello.get_speed_x()
-                speed_y = tello.get_speed_y()
-                speed_z = tello.get_speed_z()
-                roll = tello.get_roll()
-                pitch = tello.get_pitch()
-                yaw = tello.get_yaw()
-                
-                flight_time = tello.get_flight_time()
-
-                specs = {
-                    "battery": battery,
-                    "height": height,
-                    "temperature": temperature,
-                    "barometer": barometer,
-                    "speed": {"x": speed_x, "y": speed_y, "z": speed_z},
-                    "speed_magnitude": speed, # calculated speed, id trust it
-                    "acceleration": {"x": ax, "y": ay, "z": az},
-                    "roll": roll,
-                    "pitch": pitch,
-                    "yaw": yaw,
-                    "flight_time": flight_time,
-                }
-                await websocket.send_text(json.dumps(specs))
-            await asyncio.sleep(0.05)
+        # Stops when the drone is removed, otherwise nothing would notice the client leaving
+        while not hub.stop_event.is_set():
+            sample = hub.sample
+            if ready_event.is_set() and sample is not None and sample["seq"] != last_seq:
+                last_seq = sample["seq"]
+                if legacy:
+                    await websocket.send_text(json.dumps(legacy_specs(sample)))
+                else:
+                    message = subscription.encode(sample)
+                    if isinstance(message, bytes):
+                        await websocket.send_bytes(message)
+                    elif message is not None:
+                        await websocket.send_text(message)
+            await asyncio.sleep(period)
+        await websocket.close()
     except WebSocketDisconnect:
         pass
 
@@ -286,10 +542,30 @@ async def specs_websocket(websocket: WebSocket):
 def stop():
     if not tello_ready_event.is_set():
         raise HTTPException(status_code=500, detail="Tello not initialized")
-    tello.send_rc_control(0, 0, 0, 0)
+    tello.send_rc_control(*safety_monitor.filter_rc(0, 0, 0, 0))
     return {"message": "Stopping all movements"}
 
 
+@app.get("/safety")
+def safety_status():
+    return safety_monitor.status()
+
+
+@app.post("/safety/config")
+def safety_config(rules: dict):
+    try:
+        safety_monitor.configure(rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return safety_monitor.status()
+
+
+@app.post("/safety/reset")
+def safety_reset():
+    safety_monitor.reset()
+    return {"message": "Safety interlock reset"}
+
+
 @app.get("/acceleration")
 def get_acceleration():
     if not tello_ready_event.is_set():
@@ -308,14 +584,70 @@ def get_barometer():
     return {"barometer": barometer}
 
 
-@app.get("/faceRecognition")
+def check_person(person):
+    if faceRecognition.is_ready() and person not in faceRecognition.get().known_people():
+        raise HTTPException(status_code=404, detail=f"No known face for {person}")
+
+
+@app.post("/faceRecognition")
 def face_recognition(data: dict):
-    global faceProccessing
+    global faceProccessing, recognition_target
+    if not tello_ready_event.is_set():
+        raise HTTPException(status_code=500, detail="Tello not initialized")
+    person = data.get("person")
+    if person:
+        check_person(person)
+    recognition_target = person or None
+    faceRecognition.retry()
+    faceProccessing = 1
+    return {"face": "detecting " + (person or "everyone")}
+
+
+@app.post("/follow")
+def follow(data: dict):
+    global face_follower, faceProccessing, recognition_target
     if not tello_ready_event.is_set():
         raise HTTPException(status_code=500, detail="Tello not initialized")
     person = data.get("person")
+    if not person:
+        raise HTTPException(status_code=400, detail="Missing person to follow")
+    if face_follower is not None and face_follower.is_running():
+        raise HTTPException(status_code=409, detail=f"Already following {face_follower.target}")
+    rate = data.get("rate", 10.0)
+    latency_budget = data.get("latency_budget", 0.15)
+    for name, value in (("rate", rate), ("latency_budget", latency_budget)):
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or not value > 0:
+            raise HTTPException(status_code=400, detail=f"{name} must be a positive number")
+    require_unlatched()
+    # Follow needs the gallery, so load it now rather than in the control loop
+    recognizer = require_subsystem(faceRecognition)
+    check_person(person)
+    face_follower = FaceFollower(
+        tello,
+        recognizer,
+        person,
+        rate=rate,
+        latency_budget=latency_budget,
+        rc_filter=safety_monitor.filter_rc,
+    ).start()
+    recognition_target = person
     faceProccessing = 1
-    return {"face": "detecting " + person}
+    return {"message": f"Following {person}"}
+
+
+@app.post("/follow/stop")
+def follow_stop():
+    if face_follower is None or not face_follower.is_running():
+        raise HTTPException(status_code=400, detail="Not following anyone")
+    face_follower.stop()
+    return {"message": "Stopped following", "stats": face_follower.stats()}
+
+
+@app.get("/follow/stats")
+def follow_stats():
+    if face_follower is None:
+        raise HTTPException(status_code=404, detail="Follow mode hasn't been started")
+    return face_follower.stats()
 
 
 @app.get("/faceDetection")
@@ -323,14 +655,16 @@ def face_detection():
     global faceProccessing
     if not tello_ready_event.is_set():
         raise HTTPException(status_code=500, detail="Tello not initialized")
+    haarCascade.retry()
     faceProccessing = -1
     return {"face": "detecting all faces"}
 
 
 @app.get("/faceRecognitionStop")
 def face_recognition_stop():
-    global faceProccessing
+    global faceProccessing, recognition_target
     faceProccessing = 0
+    recognition_target = None
     return {"face": "stop detecting"}
 
 
@@ -364,6 +698,7 @@ def get_speed():
 def flip(data: dict):
     if not tello_ready_event.is_set():
         raise HTTPException(status_code=500, detail="Tello not initialized")
+    require_unlatched()
 
     direction = data.get("direction")
     if direction == "l":
@@ -414,6 +749,7 @@ def emergency():
 def emergency():
     if not tello_ready_event.is_set():
         raise HTTPException(status_code=500, detail="Tello not initialized")
+    require_unlatched()
     run_in_thread(tello.initiate_throw_takeoff)
     return {"message": "Throw within 5 seconds"}
 
@@ -421,10 +757,128 @@ def emergency():
 def rotate(degrees: int):
     if not tello_ready_event.is_set():
         raise HTTPException(status_code=500, detail="Tello not initialized")
+    require_unlatched()
     run_in_thread(tello.rotate_clockwise, degrees)
     return {"message": f"Rotating {degrees} degrees"}
 
 
+def start_recording(directory):
+    global tello, recorder
+    recorder = FlightRecorder(directory)
+    recorder.start_capture(tello)
+    tello = RecordingTello(tello, recorder)
+    print(f"Recording flight to {directory}")
+
+
+def recording_directory(name):
+    """Resolve a client-supplied recording name, refusing anything outside RECORDINGS_DIR."""
+    if not isinstance(name, str) or os.path.isabs(name):
+        raise HTTPException(status_code=400, detail="Recording directory must be a relative path")
+    root = os.path.realpath(RECORDINGS_DIR)
+    directory = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, directory]) != root or directory == root:
+        raise HTTPException(status_code=400, detail=f"Recording directory must be inside {RECORDINGS_DIR}/")
+    return os.path.join(RECORDINGS_DIR, os.path.relpath(directory, root))
+
+
+@app.post("/record/start")
+def record_start(data: dict = None):
+    if not tello_ready_event.is_set():
+        raise HTTPException(status_code=500, detail="Tello not initialized")
+    if recorder is not None:
+        raise HTTPException(status_code=409, detail="Already recording")
+    name = (data or {}).get("directory") or time.strftime("%Y%m%d-%H%M%S")
+    directory = recording_directory(name)
+    start_recording(directory)
+    return {"message": f"Recording to {directory}", "directory": directory}
+
+
+@app.post("/record/stop")
+def record_stop():
+    global tello, recorder
+    if recorder is None:
+        raise HTTPException(status_code=400, detail="Not recording")
+    meta = recorder.close()
+    tello = tello.tello
+    recorder = None
+    return {"message": "Recording stopped", "recording": meta}
+
+
+def publish_mission_event(event):
+    for subscriber in list(mission_subscribers):
+        subscriber.put(event)
+
+
+@app.post("/mission")
+def start_mission(plan: dict):
+    global mission_runner
+    if not tello_ready_event.is_set():
+        raise HTTPException(status_code=500, detail="Tello not initialized")
+    require_unlatched()
+    try:
+        runner = MissionRunner(
+            tello,
+            plan,
+            on_event=publish_mission_event,
+            rc_filter=safety_monitor.filter_rc,
+            interlock=lambda: safety_monitor.latched,
+        )
+    except MissionError as e:
+        raise HTTPException(status_code=400, detail=e.problems)
+    with mission_lock:
+        if mission_runner is not None and mission_runner.is_busy():
+            raise HTTPException(status_code=409, detail="A mission is already running")
+        mission_runner = runner.start()
+    return {"message": f"Mission {runner.name} started", "steps": len(runner.steps)}
+
+
+@app.post("/mission/stop")
+def stop_mission():
+    if mission_runner is None or not mission_runner.is_busy():
+        raise HTTPException(status_code=400, detail="No mission running")
+    mission_runner.stop()
+    return {"message": "Stopping mission"}
+
+
+def stop_autonomy(action):
+    """Stop a running mission and follow mode when the safety monitor latches."""
+    if mission_runner is not None and mission_runner.is_busy():
+        print(f"Safety {action}: stopping mission {mission_runner.name}")
+        mission_runner.stop()
+    if face_follower is not None and face_follower.is_running():
+        print(f"Safety {action}: stopping follow mode")
+        face_follower.stop()
+
+
+safety_monitor.add_latch_listener(stop_autonomy)
+
+
+@app.get("/mission")
+def mission_status():
+    if mission_runner is None:
+        return {"state": "idle"}
+    return {"name": mission_runner.name, "state": mission_runner.state, "events": mission_runner.events}
+
+
+@app.websocket("/ws/mission")
+async def mission_websocket(websocket: WebSocket):
+    await websocket.accept()
+    events = queue.Queue()
+    mission_subscribers.append(events)
+    try:
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                await asyncio.sleep(0.02)
+                continue
+            await websocket.send_text(json.dumps(event))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        mission_subscribers.remove(events)
+
+
 @app.get("/get_state_field")
 def get_state_field(field: str):
     if not tello_ready_event.is_set():
@@ -441,6 +895,196 @@ def query_sdk_version():
     return {"sdk_version": version}
 
 
+# Extra drones served by this process under /drones/{drone_id}/...
+registry = DroneRegistry()
+
+
+def make_registry_tello(drone_id, data):
+    if data.get("sim", USE_SIM):
+        return lambda: SimTello(host=f"sim-{drone_id}", time_scale=1.0)
+    if "host" not in data:
+        raise HTTPException(status_code=400, detail="Missing host for a real drone")
+    # Each real drone needs its own video port, set with its set_network_ports beforehand
+    return lambda: Tello(host=data["host"], vs_udp=data.get("vs_udp", 11111))
+
+
+def get_drone(drone_id):
+    drone = registry.get(drone_id)
+    if drone is None:
+        raise HTTPException(status_code=404, detail=f"No drone {drone_id}")
+    if not drone.ready_event.is_set():
+        raise HTTPException(status_code=500, detail=f"Drone {drone_id} not initialized")
+    return drone
+
+
+@app.get("/drones")
+def list_drones():
+    return registry.status()
+
+
+@app.post("/drones")
+def add_drone(data: dict = None):
+    data = data or {}
+    drone_id = data.get("id")
+    if drone_id is None:
+        drone_id = len(registry.drones) + 1
+        while str(drone_id) in registry.drones:
+            drone_id += 1
+    drone_id = str(drone_id)
+    make_tello = make_registry_tello(drone_id, data)
+    try:
+        drone = registry.add(drone_id, make_tello)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return drone.status()
+
+
+@app.delete("/drones/{drone_id}")
+def remove_drone(drone_id: str):
+    if registry.remove(drone_id) is None:
+        raise HTTPException(status_code=404, detail=f"No drone {drone_id}")
+    return {"message": f"Removed drone {drone_id}"}
+
+
+@app.get("/drones/{drone_id}")
+def drone_status(drone_id: str):
+    drone = registry.get(drone_id)
+    if drone is None:
+        raise HTTPException(status_code=404, detail=f"No drone {drone_id}")
+    return drone.status()
+
+
+def get_drone_video_stream(drone):
+    seq = 0
+    while drone.ready_event.is_set():
+        try:
+            seq, frame, _ = drone.frame_source.wait_for_frame(seq)
+            if frame is None:
+                continue
+            seq, frame = drone.snapshot_cache.get("full")
+            yield (b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + frame + b"\r\n")
+        except Exception as e:
+            print(f"Error in drone {drone.id} video stream: {e}")
+            time.sleep(1)
+
+
+@app.get("/drones/{drone_id}/video_feed")
+def drone_video_feed(drone_id: str):
+    drone = get_drone(drone_id)
+    drone.dispatch("set_video_direction", drone.tello.set_video_direction, drone.tello.CAMERA_FORWARD)
+    return StreamingResponse(
+        get_drone_video_stream(drone), media_type="multipart/x-mixed-replace; boundary=frame"
+    )
+
+
+@app.get("/drones/{drone_id}/snapshot")
+def drone_snapshot(drone_id: str, request: Request, size: str = "full"):
+    drone = get_drone(drone_id)
+    if size not in SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {', '.join(SIZES)}")
+    cache = drone.snapshot_cache
+    seq = drone.frame_source.seq
+    if seq and request.headers.get("if-none-match") == cache.etag(seq, size):
+        return Response(status_code=304, headers={"ETag": cache.etag(seq, size), "Cache-Control": "no-cache"})
+    seq, jpeg = cache.get(size)
+    if jpeg is None:
+        raise HTTPException(status_code=503, detail="No frame yet")
+    return Response(content=jpeg, media_type="image/jpeg", headers={"ETag": cache.etag(seq, size), "Cache-Control": "no-cache"})
+
+
+@app.websocket("/drones/{drone_id}/ws/move")
+async def drone_move_websocket(websocket: WebSocket, drone_id: str):
+    await websocket.accept()
+    drone = registry.get(drone_id)
+    if drone is None:
+        await websocket.send_text(json.dumps({"error": f"No drone {drone_id}"}))
+        await websocket.close()
+        return
+    drone.clients.append(websocket)
+    try:
+        while True:
+            data = json.loads(await websocket.receive_text())
+            if not drone.ready_event.is_set():
+                message = {"error": f"Drone {drone_id} not initialized"}
+            else:
+                message = drone.move(data)
+            for client in drone.clients:
+                await client.send_text(json.dumps(message))
+    except WebSocketDisconnect:
+        drone.clients.remove(websocket)
+
+
+@app.websocket("/drones/{drone_id}/ws/specs")
+async def drone_specs_websocket(
+    websocket: WebSocket,
+    drone_id: str,
+    fields: str = None,
+    rate: float = 20.0,
+    format: str = "json",
+    delta: bool = False,
+):
+    drone = registry.get(drone_id)
+    if drone is None:
+        await websocket.close(code=4404)
+        return
+    await stream_specs(websocket, drone.telemetry_hub, drone.ready_event, fields, rate, format, delta)
+
+
+@app.get("/drones/{drone_id}/takeoff")
+def drone_takeoff(drone_id: str):
+    drone = get_drone(drone_id)
+    require_unlatched(drone.safety_monitor)
+    drone.dispatch("takeoff", drone.tello.takeoff)
+    return {"message": f"Drone {drone_id} taking off..."}
+
+
+@app.get("/drones/{drone_id}/land")
+def drone_land(drone_id: str):
+    drone = get_drone(drone_id)
+    drone.dispatch("land", drone.tello.land)
+    return {"message": f"Drone {drone_id} landing..."}
+
+
+@app.post("/drones/{drone_id}/stop")
+def drone_stop(drone_id: str):
+    drone = get_drone(drone_id)
+    drone.tello.send_rc_control(*drone.safety_monitor.filter_rc(0, 0, 0, 0))
+    return {"message": "Stopping all movements"}
+
+
+@app.get("/drones/{drone_id}/emergency")
+def drone_emergency(drone_id: str):
+    drone = get_drone(drone_id)
+    drone.tello.emergency()
+    return {"message": f"Drone {drone_id} emergency stop"}
+
+
+@app.get("/drones/{drone_id}/battery")
+def drone_battery(drone_id: str):
+    return {"battery": get_drone(drone_id).tello.get_battery()}
+
+
+@app.get("/drones/{drone_id}/safety")
+def drone_safety(drone_id: str):
+    return get_drone(drone_id).safety_monitor.status()
+
+
+@app.post("/drones/{drone_id}/safety/config")
+def drone_safety_config(drone_id: str, rules: dict):
+    monitor = get_drone(drone_id).safety_monitor
+    try:
+        monitor.configure(rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return monitor.status()
+
+
+@app.post("/drones/{drone_id}/safety/reset")
+def drone_safety_reset(drone_id: str):
+    get_drone(drone_id).safety_monitor.reset()
+    return {"message": f"Drone {drone_id} safety interlock reset"}
+
+
 # Absolute path to the directory containing your static files
 static_files_path = os.path.join(os.path.dirname(__file__), "build", "_app")
 
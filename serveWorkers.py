@@ -0,0 +1,68 @@
+"""
+Run the backend as several uvicorn worker processes sharing one drone. Starts
+ingest.py, waits for it to accept commands, then serves runBackend with
+TELLO_INGEST pointing every worker at it.
+
+    python serveWorkers.py --workers 4
+    python serveWorkers.py --workers 4 --sim --port 8000
+
+Each worker keeps its own detection mode, follow loop, missions, recordings and
+extra drones, so those are per worker. Video, snapshots, telemetry, rc input and
+the safety interlock are shared.
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from multiprocessing.connection import Client
+
+import uvicorn
+
+from dependencies.remoteTello import AUTHKEY_ENV, new_authkey, parse_address
+
+
+def wait_for_ingest(process, address, authkey, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"ingest.py exited with code {process.returncode}")
+        try:
+            Client(parse_address(address), authkey=authkey).close()
+            return
+        except (ConnectionRefusedError, OSError):
+            time.sleep(0.1)
+    raise TimeoutError(f"ingest.py didn't start listening within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker backend")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--ingest-address", default="127.0.0.1:8790")
+    parser.add_argument("--sim", action="store_true", help="fly the simulated drone")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the drone to connect")
+    args = parser.parse_args()
+
+    # A fresh key every run, handed to ingest.py and the workers through the environment
+    authkey = new_authkey()
+    os.environ[AUTHKEY_ENV] = authkey.hex()
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest.py")]
+    command += ["--address", args.ingest_address] + (["--sim"] if args.sim else [])
+    ingest = subprocess.Popen(command)
+    # uvicorn passes SIGTERM on once it has shut down, exit through the finally below instead of dying
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        wait_for_ingest(ingest, args.ingest_address, authkey, args.timeout)
+        os.environ["TELLO_INGEST"] = args.ingest_address
+        uvicorn.run("runBackend:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        ingest.terminate()
+        ingest.wait()
+
+
+if __name__ == "__main__":
+    main()